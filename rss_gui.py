@@ -1,25 +1,118 @@
 import threading
+import weakref
+import argparse
+import os
+import random
+import heapq
+import math
+from functools import lru_cache, partial
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from readability import Document
-from urllib.parse import urljoin, urlparse, urlunparse
+import lxml.html
+import lxml.etree
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxHTMLParser
+    except ImportError:
+        SelectolaxHTMLParser = None
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, quote
+from urllib.robotparser import RobotFileParser
 import tldextract
 from feedgen.feed import FeedGenerator
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import webview
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import hashlib
+import gzip
+import io
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from datetime import datetime, timezone
+import sqlite3
+import json
+import re
+from xml.sax.saxutils import escape
 import ssl
 
 # ---------------------- 配置 ----------------------
 GEMINI_API_KEY = ""
+GEMINI_ENDPOINT = "https://api.gemini.com/v1/extract"   # 可改为本地桩服务地址用于测试
+AI_CACHE_DB = "ai_cache.db"     # AI 提取结果缓存（按裁剪后内容的哈希）
+AI_WORKERS = 2                  # AI 提取并发数，独立于抓取线程
+AI_MAX_INPUT_CHARS = 60000      # 发送给 AI 的 HTML 上限
 RSS_FILENAME = "site_full_rss.xml"
-LOCAL_RSS_URL = "http://localhost:8000/rss"
+RSS_STREAM = False              # True 时 RSS 逐条写入磁盘，发布到本地服务时再从文件读取
+RSS_SERVER_HOST = "localhost"
+RSS_SERVER_PORT = 8000
+LOCAL_RSS_URL = f"http://{RSS_SERVER_HOST}:{RSS_SERVER_PORT}/rss"
+FEEDS_DIR = "feeds"   # 无界面模式下每个站点的 RSS 文件目录
+FEED_CACHE_BYTES = 32*1024*1024       # 每个 FeedWriter 缓存的 <item> 片段总大小上限
+SCHEDULE_INTERVAL = 3600        # 定时重抓的默认间隔（秒）
+SCHEDULE_JITTER = 0.1           # 间隔随机抖动比例（±10%）
+SCHEDULE_MAX_CONCURRENT = 2     # 所有站点合计同时进行的抓取数
+UI_FLUSH_INTERVAL = 0.15        # 界面日志/进度合并推送的间隔（秒）
+UI_LOG_LINES = 500              # 界面日志最多保留的行数
+UI_LIST_PAGE = 500              # 每次推送到界面的文章列表条目上限
+RSS_GZIP_LEVEL = 6
 MAX_PAGES = 500
+CRAWL_WORKERS = 8
+EXTRACT_PROCESSES = 0   # >0 时正文提取交给多进程池执行，0 表示在抓取线程内提取
+HTTP_POOL_CONNECTIONS = 10   # 缓存的主机连接池数量
+HTTP_POOL_MAXSIZE = 16       # 每个主机的最大保持连接数，应不小于 CRAWL_WORKERS
+HTTP_RETRIES = 2
+HTTP_HEADERS = {'User-Agent':'Mozilla/5.0'}
+CRAWL_DB = "crawl_store.db"
+DOMAIN_CACHE_SIZE = 4096
+PARSER_BACKEND = "lxml"   # 可选 "lxml" / "selectolax" / "html.parser"
+DEDUP_THRESHOLD = 0.85   # 近重复判定的 Jaccard 相似度阈值
+DEDUP_SHINGLE = 4         # 每个 shingle 的词元数
+DEDUP_BINS = 64           # MinHash 签名长度
+DEDUP_BAND_ROWS = 4       # LSH 每段行数（64/4=16 段）
+INCREMENTAL_CRAWL = True   # 使用 ETag / Last-Modified / 内容哈希跳过未变化页面
+POLITE_CRAWL = True             # 按主机限速并遵守 robots.txt
+POLITE_RATE = 4.0               # 每个主机默认每秒请求数（令牌桶速率）
+POLITE_BURST = 4                # 令牌桶容量
+POLITE_START_CONCURRENCY = 2    # 每个主机的初始并发，延迟低时逐步提高到 CRAWL_WORKERS
+POLITE_TARGET_LATENCY = 1.0     # 平均响应时间低于该值（秒）才提高并发
+POLITE_RETRIES = 2              # 429/503 后按 Retry-After 等待并重试的次数
+POLITE_MAX_BACKOFF = 300        # 单次退避的最长等待（秒）
+SITEMAP_DISCOVERY = True        # 先从 robots.txt / sitemap.xml / 页面声明的 RSS 中发现文章链接
+SITEMAP_MAX_FILES = 50          # 最多读取的 sitemap / 订阅源文件数
+SITEMAP_MAX_URLS = 20000        # 最多入队的发现链接数
+PRIORITY_FRONTIER = True        # 按“像文章”的程度排序待抓队列；False 时为先进先出
+PRIORITY_RESCORE_EVERY = 50     # 每完成多少页，用站内统计重新给队列打分
+PRIORITY_ARTICLE_CHARS = 500    # 正文达到该长度才算作有效文章（用于站内统计）
+ANCHOR_TEXT_CHARS = 80          # 每个链接保留的锚文本长度
+FEED_TYPES = ("application/rss+xml","application/atom+xml")
+TRACKING_PARAMS = {"fbclid","gclid","dclid","msclkid","yclid","igshid","mc_cid","mc_eid","_ga","_gl","_hsenc","_hsmla",
+                   "spm","ref_src","share","replytocom","sessionid","session_id","sid","phpsessid","jsessionid",
+                   "aspsessionid","cfid","cftoken"}
+TRACKING_PREFIXES = ("utm_","pk_","mtm_")
+URL_RULES = {
+    # 按注册域名定制查询参数规则，例如：
+    # "example.com": {"keep": ["p","page"]},        # 只保留这些参数
+    # "example.org": {"drop": ["sort","view"]},     # 在通用规则之外再去掉这些参数
+    # "example.net": {"drop_query": True},          # 丢弃全部查询参数
+    # 也可以是函数：url -> url，在通用规范化之后调用
+}
 
 # ---------------------- 全局状态 ----------------------
+webview = None   # 仅图形界面模式下导入 pywebview
 visited_links = set()
 articles = []
-rss_cache = ""
+rss_cache = None   # 最近发布的 FeedBody，对应 /rss
+feeds = {}         # site_id -> FeedBody，对应 /rss/<site_id>
+_http_session = None
+_http_session_lock = threading.Lock()
 theme_settings = {
     "font_size": "16px",
     "line_height": "1.8",
@@ -28,183 +121,1620 @@ theme_settings = {
 }
 
 # ---------------------- 工具函数 ----------------------
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_PERCENT_RE = re.compile("%([0-9A-Fa-f]{2})")
+_SESSION_PATH_RE = re.compile(r";(jsessionid|phpsessid|sid|sessionid)=[^/]*", re.I)
+_DEFAULT_PORTS = {"http":80, "https":443}
+
+def _normalize_escapes(text, safe):
+    # 非保留字符解码，其余转义统一为大写；非 ASCII 字符按 UTF-8 转义
+    text = _PERCENT_RE.sub(lambda m: chr(int(m.group(1),16)) if chr(int(m.group(1),16)) in _UNRESERVED else "%"+m.group(1).upper(), text)
+    return quote(text, safe=safe+"%")
+
+def _query_name(pair):
+    return _PERCENT_RE.sub(lambda m: chr(int(m.group(1),16)), pair.split("=",1)[0].replace("+"," ")).lower()
+
 def normalize_url(url):
-    parsed = urlparse(url)
-    normalized = parsed._replace(query="", fragment="")
-    return urlunparse(normalized).rstrip("/")
+    # 规范化：协议/主机小写、去默认端口与路径中的会话 ID、统一百分号转义、
+    # 去掉跟踪参数并排序其余查询参数、去片段；站点规则见 URL_RULES
+    parsed = urlsplit(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").rstrip(".")
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    netloc = f"[{host}]" if ":" in host else host
+    if port not in (None, _DEFAULT_PORTS.get(scheme)):
+        netloc = f"{netloc}:{port}"
+    if parsed.username:
+        netloc = f"{parsed.username}{':'+parsed.password if parsed.password else ''}@{netloc}"
+    path = _normalize_escapes(_SESSION_PATH_RE.sub("", parsed.path), "/:@!$&'()*+,;=")
+    rules = URL_RULES.get(registered_domain(host), {}) if URL_RULES else {}
+    custom = rules if callable(rules) else None
+    rules = {} if custom else rules
+    keep = set(rules["keep"]) if "keep" in rules else None
+    drop = set(rules.get("drop",()))
+    query = []
+    for pair in ([] if rules.get("drop_query") else parsed.query.split("&")):
+        name = _query_name(pair)
+        if not pair or name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES) or name in drop:
+            continue
+        if keep is None or name in keep:
+            query.append(_normalize_escapes(pair, "=:@!$'()*+,;/?"))
+    normalized = urlunsplit((scheme, netloc, path.rstrip("/"), "&".join(sorted(query)), ""))
+    return custom(normalized) if custom else normalized
 
-def is_same_domain(base, target):
-    base_domain = tldextract.extract(base).top_domain_under_public_suffix
-    target_domain = tldextract.extract(target).top_domain_under_public_suffix
-    return base_domain == target_domain
+def url_key(url):
+    # 去重键：在 normalize_url 基础上忽略 http/https 与 www. 的差别（抓取时仍使用原协议和主机）
+    parsed = urlsplit(normalize_url(url))
+    host = parsed.netloc[4:] if parsed.netloc.startswith("www.") else parsed.netloc
+    return urlunsplit(("", host, parsed.path, parsed.query, ""))[2:]
 
-def html_to_text(html):
-    return BeautifulSoup(html, "html.parser").get_text("\n", strip=True)
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def registered_domain(netloc):
+    return tldextract.extract(netloc).top_domain_under_public_suffix
 
-def fix_image_urls(soup, base_url):
-    for img in soup.find_all("img"):
-        src = img.get("src") or img.get("data-src") or img.get("data-original")
-        if src:
-            img["src"] = urljoin(base_url, src)
-            img["style"] = "max-width:100%;height:auto;"
-    return soup
+def url_domain(url):
+    # 按 netloc 缓存注册域名，同一主机只做一次 tldextract
+    return registered_domain(urlparse(url).netloc.lower())
 
-def append_log(msg):
-    print(msg)
+def absolute_link(base, href):
+    # 单个畸形链接（如 "http://[bad"）只跳过它自己，不影响整页的链接与正文
+    if href is None:
+        return None
     try:
-        if webview.windows:
-            js = f'document.getElementById("log").innerHTML += "{msg}<br>";' \
-                 f'document.getElementById("log").scrollTop=document.getElementById("log").scrollHeight;'
+        return normalize_url(urljoin(base, href))
+    except ValueError:
+        return None
+
+def get_session():
+    # 所有网络请求共用一个 Session，复用 TCP/TLS 连接；requests.Session 可在线程间共享
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                session.headers.update(HTTP_HEADERS)
+                # 429/503 的 Retry-After 交给 fetch_response / PolitenessScheduler 处理，urllib3 不在内部静默重试
+                retry = Retry(total=HTTP_RETRIES, backoff_factor=0.5, status_forcelist=(500,502,504), allowed_methods=("GET","HEAD"),
+                              respect_retry_after_header=False)
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _http_session = session
+    return _http_session
+
+class UIChannel:
+    # 日志与进度先进入缓冲区，由后台线程按固定帧率合并成一次 evaluate_js 推送，
+    # 抓取线程不再等待 webview 桥；待推送日志是有界环形缓冲
+    def __init__(self, interval=None, max_lines=None):
+        self.interval = interval or UI_FLUSH_INTERVAL
+        self.max_lines = max_lines or UI_LOG_LINES
+        self.lines = deque(maxlen=self.max_lines)
+        self.progress = None
+        self.items = []
+        self.reset_list = False
+        self.lock = threading.Lock()
+
+    def log(self, msg):
+        with self.lock:
+            self.lines.append(msg)
+
+    def set_progress(self, val):
+        with self.lock:
+            self.progress = val
+
+    def reset_articles(self):
+        with self.lock:
+            self.items.clear()
+            self.reset_list = True
+
+    def update_article(self, index, title):
+        # 文章列表只传 {序号, 标题}，新增和替换都走这里
+        with self.lock:
+            self.items.append({"i": index, "t": title})
+
+    def flush(self):
+        with self.lock:
+            lines = list(self.lines)
+            self.lines.clear()
+            progress, self.progress = self.progress, None
+            reset, self.reset_list = self.reset_list, False
+            items = self.items[:UI_LIST_PAGE]
+            del self.items[:UI_LIST_PAGE]
+        js = ""
+        if reset:
+            js += "resetArticles();"
+        if items:
+            js += f"updateArticles({json.dumps(items, ensure_ascii=False)});"
+        if lines or progress is not None:
+            js += f"pushUpdates({json.dumps(lines, ensure_ascii=False)},{json.dumps(progress)},{self.max_lines});"
+        if js and webview and webview.windows:
             webview.windows[0].evaluate_js(js)
-    except:
-        pass
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except:
+                pass
+
+ui_channel = UIChannel()
+
+def append_log(msg):
+    print(msg)
+    if webview:
+        ui_channel.log(msg)
 
 def update_progress(val):
-    try:
-        if webview.windows:
-            js = f'document.getElementById("progress").value={val:.2f};' \
-                 f'document.getElementById("progress_text").innerText="进度: {val:.2f}%";'
-            webview.windows[0].evaluate_js(js)
-    except:
-        pass
+    if webview:
+        ui_channel.set_progress(round(val, 2))
+
+# ---------------------- HTML 解析后端 ----------------------
+# 标题、链接、图片修正和纯文本提取统一走解析后端，由 PARSER_BACKEND 选择；
+# 不可用时回退到 BeautifulSoup + html.parser（原有行为）
+class SoupParser:
+    name = "html.parser"
+
+    def document(self, html):
+        return BeautifulSoup(html, "html.parser")
+
+    def fragment(self, html):
+        return BeautifulSoup(html, "html.parser")
+
+    def readability_input(self, doc, html):
+        return html
+
+    def title(self, soup, url):
+        for selector in ['h1','h2','h3']:
+            tag = soup.select_one(selector)
+            if tag and tag.get_text(strip=True):
+                return tag.get_text(strip=True)
+        og = soup.find("meta", property="og:title") or soup.find("meta", attrs={"name":"twitter:title"})
+        if og and og.get("content"):
+            return og["content"]
+        if soup.title and soup.title.string:
+            return soup.title.string.strip()
+        return url.split("/")[-1] or url
+
+    def canonical(self, soup):
+        tag = soup.find("link", rel="canonical", href=True)
+        return tag["href"] if tag else None
+
+    def feeds(self, soup, url):
+        return [absolute_link(url, l["href"]) for l in soup.find_all("link", href=True)
+                if "alternate" in [r.lower() for r in l.get("rel") or []] and (l.get("type") or "").lower() in FEED_TYPES]
+
+    def anchors(self, soup, url):
+        pairs = []
+        for a in soup.find_all("a", href=True):
+            link = absolute_link(url, a["href"])
+            if link:
+                pairs.append((link, a.get_text(" ", strip=True)[:ANCHOR_TEXT_CHARS]))
+        return pairs
+
+    def fix_images(self, soup, base_url):
+        for img in soup.find_all("img"):
+            src = img.get("src") or img.get("data-src") or img.get("data-original")
+            if src:
+                img["src"] = urljoin(base_url, src)
+                img["style"] = "max-width:100%;height:auto;"
+        return soup
+
+    def text(self, soup):
+        return soup.get_text("\n", strip=True)
+
+    def to_html(self, soup):
+        return str(soup)
+
+class LxmlParser:
+    # 整页只解析一次，readability 直接复用同一棵树（内部会先做清洗拷贝）
+    name = "lxml"
+
+    def document(self, html):
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # 带 <?xml encoding?> 声明的字符串 lxml 不接受，转成 bytes 再解析
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+
+    def fragment(self, html):
+        try:
+            return lxml.html.fragment_fromstring(html, create_parent="div")
+        except ValueError:
+            return lxml.html.fragment_fromstring(html.encode("utf-8"), create_parent="div")
+
+    def readability_input(self, doc, html):
+        return doc
+
+    def title(self, doc, url):
+        for tag in ("h1","h2","h3"):
+            el = next(doc.iter(tag), None)
+            if el is not None:
+                text = "".join(t.strip() for t in el.itertext())
+                if text:
+                    return text
+        og = doc.xpath('//meta[@property="og:title"]') or doc.xpath('//meta[@name="twitter:title"]')
+        if og and og[0].get("content"):
+            return og[0].get("content")
+        title = doc.find(".//title")
+        if title is not None and title.text and title.text.strip():
+            return title.text.strip()
+        return url.split("/")[-1] or url
+
+    def canonical(self, doc):
+        hrefs = doc.xpath('//link[@rel="canonical"]/@href')
+        return hrefs[0] if hrefs else None
+
+    def feeds(self, doc, url):
+        return [absolute_link(url, l.get("href")) for l in doc.iter("link")
+                if "alternate" in (l.get("rel") or "").lower().split() and (l.get("type") or "").lower() in FEED_TYPES]
+
+    def anchors(self, doc, url):
+        pairs = []
+        for a in doc.iter("a"):
+            link = absolute_link(url, a.get("href"))
+            if link:
+                pairs.append((link, " ".join(a.text_content().split())[:ANCHOR_TEXT_CHARS]))
+        return pairs
+
+    def fix_images(self, el, base_url):
+        for img in el.iter("img"):
+            src = img.get("src") or img.get("data-src") or img.get("data-original")
+            if src:
+                img.set("src", urljoin(base_url, src))
+                img.set("style", "max-width:100%;height:auto;")
+        return el
+
+    def text(self, el):
+        return "\n".join(t.strip() for t in el.xpath(".//text()[not(ancestor::script or ancestor::style)]") if t.strip())
+
+    def to_html(self, el):
+        return lxml.html.tostring(el, encoding="unicode")
+
+class SelectolaxParser:
+    # C 实现的 HTML5 解析器；readability 仍需从字符串自行构建 lxml 树
+    name = "selectolax"
+
+    def document(self, html):
+        return SelectolaxHTMLParser(html)
+
+    def fragment(self, html):
+        return SelectolaxHTMLParser(html)
+
+    def readability_input(self, doc, html):
+        return html
+
+    def title(self, doc, url):
+        for selector in ("h1","h2","h3"):
+            node = doc.css_first(selector)
+            if node is not None:
+                text = node.text(deep=True, separator="", strip=True)
+                if text:
+                    return text
+        og = doc.css_first('meta[property="og:title"]') or doc.css_first('meta[name="twitter:title"]')
+        if og is not None and og.attributes.get("content"):
+            return og.attributes["content"]
+        node = doc.css_first("title")
+        if node is not None and node.text().strip():
+            return node.text().strip()
+        return url.split("/")[-1] or url
+
+    def canonical(self, doc):
+        node = doc.css_first('link[rel="canonical"]')
+        return node.attributes.get("href") if node is not None else None
+
+    def feeds(self, doc, url):
+        return [absolute_link(url, l.attributes.get("href")) for l in doc.css("link[href]")
+                if "alternate" in (l.attributes.get("rel") or "").lower().split()
+                and (l.attributes.get("type") or "").lower() in FEED_TYPES]
+
+    def anchors(self, doc, url):
+        pairs = []
+        for a in doc.css("a[href]"):
+            link = absolute_link(url, a.attributes.get("href"))
+            if link:
+                pairs.append((link, " ".join(a.text().split())[:ANCHOR_TEXT_CHARS]))
+        return pairs
+
+    def fix_images(self, doc, base_url):
+        for img in doc.css("img"):
+            src = img.attributes.get("src") or img.attributes.get("data-src") or img.attributes.get("data-original")
+            if src:
+                img.attrs["src"] = urljoin(base_url, src)
+                img.attrs["style"] = "max-width:100%;height:auto;"
+        return doc
+
+    def text(self, doc):
+        doc.strip_tags(["script","style"])
+        root = doc.body or doc.root
+        return root.text(separator="\n", strip=True) if root is not None else ""
+
+    def to_html(self, doc):
+        return doc.html or ""
+
+PARSERS = {"html.parser": SoupParser, "lxml": LxmlParser}
+if SelectolaxHTMLParser is not None:
+    PARSERS["selectolax"] = SelectolaxParser
+_parsers = {}
+
+def get_parser(name=None):
+    name = name or PARSER_BACKEND
+    if name not in PARSERS:
+        name = "html.parser"
+    if name not in _parsers:
+        _parsers[name] = PARSERS[name]()
+    return _parsers[name]
+
+def build_content(parser, content, url):
+    content = parser.fix_images(content, url)
+    return parser.to_html(content), parser.text(content)
 
 # ---------------------- AI 提取正文 ----------------------
-def gemini_extract(url, html):
+class AICache:
+    # 持久化的 AI 提取结果：相同内容（裁剪后 HTML 的哈希）重抓时不再调用接口
+    def __init__(self, path=None):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path or AI_CACHE_DB, timeout=30, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ai_cache(key TEXT PRIMARY KEY, content TEXT)")
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT content FROM ai_cache WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, content):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO ai_cache VALUES(?,?)", (key,content))
+
+_ai_cache = None
+_ai_cache_lock = threading.Lock()
+_ai_key_locks = weakref.WeakValueDictionary()
+
+def get_ai_cache():
+    global _ai_cache
+    if _ai_cache is None:
+        with _ai_cache_lock:
+            if _ai_cache is None:
+                _ai_cache = AICache()
+    return _ai_cache
+
+def _ai_key_lock(key):
+    with _ai_cache_lock:
+        lock = _ai_key_locks.get(key)
+        if lock is None:
+            lock = _ai_key_locks[key] = threading.Lock()
+        return lock
+
+_AI_DROP_XPATH = "//script|//style|//noscript|//svg|//iframe|//nav|//header|//footer|//aside|//form|//comment()"
+_AI_KEEP_ATTRS = {"href","src","alt"}
+
+def trim_for_ai(html, limit=None):
+    # 只把候选正文区域发给 AI：去掉脚本、导航、页眉页脚等，并清理无关属性
+    limit = limit or AI_MAX_INPUT_CHARS
     try:
-        headers = {"Authorization": f"Bearer {GEMINI_API_KEY}"}
-        data = {"input": html, "task": "extract_article"}
-        response = requests.post("https://api.gemini.com/v1/extract", headers=headers, json=data, timeout=15)
-        response.raise_for_status()
-        content = response.json().get("content","")
-        if content.strip():
-            return content
+        doc = LxmlParser().document(html)
+        for el in doc.xpath(_AI_DROP_XPATH):
+            el.drop_tree()
+        region = next(iter(doc.xpath('//article|//main|//*[@role="main"]')), None)
+        if region is None:
+            region = doc.find("body") if doc.find("body") is not None else doc
+        for el in region.iter():
+            for attr in [a for a in el.attrib if a not in _AI_KEEP_ATTRS]:
+                del el.attrib[attr]
+        trimmed = lxml.html.tostring(region, encoding="unicode")
+    except Exception:
+        trimmed = html
+    return trimmed[:limit]
+
+def gemini_extract(url, html):
+    # 未配置 API Key 时跳过 AI 提取（README 约定的行为）
+    if not GEMINI_API_KEY:
         return html
+    trimmed = trim_for_ai(html)
+    key = hashlib.sha1((GEMINI_ENDPOINT+"\0"+trimmed).encode("utf-8")).hexdigest()
+    cache = get_ai_cache()
+    content = cache.get(key)
+    if content is not None:
+        return content
+    # 相同内容的并发请求串行化，后到者直接命中缓存
+    with _ai_key_lock(key):
+        content = cache.get(key)
+        if content is not None:
+            return content
+        try:
+            headers = {"Authorization": f"Bearer {GEMINI_API_KEY}"}
+            data = {"input": trimmed, "task": "extract_article"}
+            response = get_session().post(GEMINI_ENDPOINT, headers=headers, json=data, timeout=15)
+            response.raise_for_status()
+            content = response.json().get("content","")
+            if content.strip():
+                cache.put(key, content)
+                return content
+            return html
+        except Exception as e:
+            append_log(f"⚠️ Gemini 提取失败: {e}")
+            return html
+
+def complete_with_ai(url, article, html):
+    # 在 AI 队列中运行时不在 parse_page 的 try 内，失败时退回 readability 的短正文，不影响抓取主循环
+    try:
+        parser = get_parser()
+        content_html, content_text = build_content(parser, parser.fragment(gemini_extract(url, html)), url)
     except Exception as e:
-        append_log(f"⚠️ Gemini 提取失败: {e}")
-        return html
+        append_log(f"⚠️ AI 正文处理失败: {url} ({e})")
+        return article
+    return dict(article, content=content_html, content_text=content_text)
 
-# ---------------------- 文章抓取 ----------------------
-def extract_title(soup, url):
-    for selector in ['h1','h2','h3']:
-        tag = soup.select_one(selector)
-        if tag and tag.get_text(strip=True):
-            return tag.get_text(strip=True)
-    og = soup.find("meta", property="og:title") or soup.find("meta", attrs={"name":"twitter:title"})
-    if og and og.get("content"):
-        return og["content"]
-    if soup.title and soup.title.string:
-        return soup.title.string.strip()
-    return url.split("/")[-1] or url
+class AIExtractQueue:
+    # AI 提取放到独立线程池异步执行，抓取线程不必等待接口返回
+    def __init__(self, workers=None):
+        self.pool = ThreadPoolExecutor(max_workers=workers or AI_WORKERS)
 
-def extract_article(url):
+    def submit(self, url, article, html):
+        return self.pool.submit(complete_with_ai, url, article, html)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# ---------------------- 文章抓取 ----------------------
+def fetch_response(url, headers=None, polite=None):
+    attempts = POLITE_RETRIES+1 if polite else 1
+    for attempt in range(attempts):
+        if polite:
+            polite.acquire(url)
+        start = time.monotonic()
+        r = None
+        try:
+            r = get_session().get(url, timeout=10, verify=False, headers=headers)
+        except Exception as e:
+            append_log(f"❌ 请求失败: {url} ({e})")
+            return None
+        finally:
+            if polite:
+                polite.release(url, r, time.monotonic()-start)
+        if not (polite and r.status_code in (429,503) and attempt<attempts-1):
+            break
+        append_log(f"⏳ 服务器限流 ({r.status_code})，稍后重试: {url}")
     try:
-        r = requests.get(url, timeout=10, headers={'User-Agent':'Mozilla/5.0'}, verify=False)
         r.raise_for_status()
-        if "text/html" not in r.headers.get("Content-Type",""):
-            return None
-        soup = BeautifulSoup(r.text,"html.parser")
-        title = extract_title(soup,url)
+    except Exception as e:
+        append_log(f"❌ 请求失败: {url} ({e})")
+        return None
+    if r.status_code!=304 and "text/html" not in r.headers.get("Content-Type",""):
+        return None
+    return r
+
+def fetch_page(url):
+    r = fetch_response(url)
+    return r.text if r is not None else None
+
+def parse_page(url, html, ai_fallback=True):
+    # 一次下载、一次解析：同一个文档对象用于标题、链接和正文提取；
+    # ai_fallback=False 时正文过短的页面只打上 ai_html 标记，由调用方异步补全
+    try:
+        parser = get_parser()
+        doc = parser.document(html)
+        title = parser.title(doc,url)
+        links = parser.anchors(doc,url)
+        # 规范 URL 只用于文章的 url / 标题；图片等相对地址仍按实际抓取的页面解析
+        canonical = canonical_url(url, parser.canonical(doc))
         try:
-            doc = Document(r.text)
-            content_html = doc.summary()
+            content = parser.fragment(Document(parser.readability_input(doc,html)).summary())
         except:
-            content_html = str(soup)
-        soup_content = BeautifulSoup(content_html,"html.parser")
-        soup_content = fix_image_urls(soup_content,url)
-        content_text = html_to_text(str(soup_content))
+            content = doc
+        content_html, content_text = build_content(parser, content, url)
+        article = {"title":f"{title} ({canonical})","url":canonical,"content":content_html,"content_text":content_text}
+        feeds = [f for f in parser.feeds(doc,url) if f]
+        if feeds:
+            # 页面声明的订阅源随结果返回，首页的订阅源由 get_all_links 读取，无需再次下载首页
+            article["feeds"] = feeds
         if len(content_text)<200:
-            ai_content = gemini_extract(url,r.text)
-            soup_content = BeautifulSoup(ai_content,"html.parser")
-            soup_content = fix_image_urls(soup_content,url)
-            content_text = html_to_text(str(soup_content))
-        return {"title":f"{title} ({url})","url":url,"content":str(soup_content),"content_text":content_text}
+            if not ai_fallback and GEMINI_API_KEY:
+                article["ai_html"] = html
+            else:
+                article = complete_with_ai(url, article, html)
+        return article, links
     except Exception as e:
-        append_log(f"❌ 请求失败: {url} ({e})")
+        append_log(f"❌ 解析失败: {url} ({e})")
+        return None, []
+
+def canonical_url(url, href):
+    # <link rel="canonical">：只接受同域、且不是把内页指向首页的声明
+    canonical = absolute_link(url, href) if href else None
+    if not canonical or url_domain(canonical)!=url_domain(url) or (not urlparse(canonical).path and urlparse(normalize_url(url)).path):
+        return url
+    return canonical
+
+def extract_article(url):
+    html = fetch_page(url)
+    if html is None:
         return None
+    article, _ = parse_page(url, html)
+    return article
 
-def deduplicate_articles(arts):
-    seen = {}
+# ---------------------- 去重 ----------------------
+# 词元 shingle + 单次置换 MinHash（分桶取最小值）+ LSH 分段索引，近似线性时间找近重复文章。
+# 使用内置 hash()，签名只在同一进程内比较。
+_HASH_MASK = (1<<64)-1
+_EMPTY_BIN = _HASH_MASK
+_TOKEN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]|[^\W\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]+")
+
+def minhash_signature(text, bins=None, shingle=None):
+    bins = bins or DEDUP_BINS
+    shingle = shingle or DEDUP_SHINGLE
+    # 西文按单词、中日韩按单字切分，再取连续 shingle 个词元作为 shingle
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens)<=shingle:
+        shingles = {tuple(tokens)}
+    else:
+        shingles = set(zip(*(tokens[i:] for i in range(shingle))))
+    sig = [_EMPTY_BIN]*bins
+    for h in map(hash, shingles):
+        h &= _HASH_MASK
+        b = h % bins
+        v = h // bins
+        if v<sig[b]:
+            sig[b] = v
+    # 空桶用右侧最近的非空桶填充（densification），保证短文本也能比较
+    if _EMPTY_BIN in sig and any(v!=_EMPTY_BIN for v in sig):
+        for i in range(bins):
+            j = i
+            while sig[j % bins]==_EMPTY_BIN:
+                j += 1
+            if sig[i]==_EMPTY_BIN:
+                sig[i] = sig[j % bins] ^ (j-i)
+    return sig
+
+def signature_similarity(a, b):
+    return sum(1 for x,y in zip(a,b) if x==y)/len(a)
+
+class NearDuplicateIndex:
+    def __init__(self, threshold=None, band_rows=None):
+        self.threshold = DEDUP_THRESHOLD if threshold is None else threshold
+        self.band_rows = band_rows or DEDUP_BAND_ROWS
+        self.buckets = {}
+        self.signatures = {}
+
+    def _bands(self, sig):
+        r = self.band_rows
+        return [(i, tuple(sig[i:i+r])) for i in range(0, len(sig), r)]
+
+    def find(self, sig):
+        best, best_sim = None, self.threshold
+        checked = set()
+        for band in self._bands(sig):
+            for key in self.buckets.get(band, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                for other in self.signatures[key]:
+                    sim = signature_similarity(sig, other)
+                    if sim>=best_sim:
+                        best, best_sim = key, sim
+        return best
+
+    def add(self, key, sig):
+        self.signatures.setdefault(key, []).append(sig)
+        for band in self._bands(sig):
+            self.buckets.setdefault(band, []).append(key)
+
+def merge_duplicate(index, kept, article):
+    # 去重的单步，批量与抓取中的在线去重共用：返回 (序号, 状态)；
+    # "new" 表示应追加到 kept 末尾，"replaced" 表示正文更长、应替换 kept[序号]，"duplicate" 表示丢弃
+    sig = minhash_signature(article["content_text"])
+    slot = index.find(sig)
+    if slot is None:
+        index.add(len(kept), sig)
+        return len(kept), "new"
+    index.add(slot, sig)
+    if article_length(article)>article_length(kept[slot]):
+        return slot, "replaced"
+    return slot, "duplicate"
+
+def deduplicate_articles(arts, threshold=None):
+    # 相似度达到阈值视为重复，保留正文更长的一份，顺序按首次出现
+    index = NearDuplicateIndex(threshold)
     result = []
     for a in arts:
-        key = hashlib.md5(a["content_text"].encode("utf-8")).hexdigest()
-        if key in seen:
-            if len(a["content_text"])>len(seen[key]["content_text"]):
-                seen[key]=a
-        else:
-            seen[key]=a
-    result.extend(seen.values())
+        slot, status = merge_duplicate(index, result, a)
+        if status=="new":
+            result.append(a)
+        elif status=="replaced":
+            result[slot] = a
     return result
 
+# ---------------------- 多进程提取 ----------------------
+def _init_extract_process(parser_backend, api_key, endpoint, ai_cache_db):
+    # 子进程（Windows 下为 spawn）不会继承运行时修改过的配置，这里显式同步
+    global PARSER_BACKEND, GEMINI_API_KEY, GEMINI_ENDPOINT, AI_CACHE_DB
+    PARSER_BACKEND = parser_backend
+    GEMINI_API_KEY = api_key
+    GEMINI_ENDPOINT = endpoint
+    AI_CACHE_DB = ai_cache_db
+
+class ProcessExtractor:
+    # 抓取线程把原始 HTML 交给进程池解析，readability/解析不再受 GIL 限制
+    def __init__(self, processes):
+        self.pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_extract_process,
+                                        initargs=(PARSER_BACKEND, GEMINI_API_KEY, GEMINI_ENDPOINT, AI_CACHE_DB))
+
+    def __call__(self, url, html, ai_fallback=True):
+        try:
+            return self.pool.submit(parse_page, url, html, ai_fallback).result()
+        except Exception as e:
+            append_log(f"⚠️ 进程池提取失败，改为本进程提取: {url} ({e})")
+            return parse_page(url, html, ai_fallback)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+# ---------------------- 抓取存储（断点续抓） ----------------------
+class CrawlStore:
+    # SQLite 持久化：待抓队列、已访问集合与已提取文章按站点增量保存
+    def __init__(self, path=None):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path or CRAWL_DB, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS frontier(site TEXT, url TEXT, PRIMARY KEY(site,url));
+            CREATE TABLE IF NOT EXISTS visited(site TEXT, url TEXT, PRIMARY KEY(site,url));
+            CREATE TABLE IF NOT EXISTS articles(site TEXT, url TEXT, seq INTEGER, title TEXT, content TEXT, content_text TEXT, PRIMARY KEY(site,url));
+            CREATE TABLE IF NOT EXISTS pages(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT, article TEXT, links TEXT);
+        """)
+        self.conn.commit()
+
+    def reset(self, site):
+        with self.lock, self.conn:
+            for table in ("frontier","visited","articles"):
+                self.conn.execute(f"DELETE FROM {table} WHERE site=?", (site,))
+            self.conn.execute("INSERT OR IGNORE INTO frontier VALUES(?,?)", (site,site))
+
+    def load(self, site, lazy=False):
+        # lazy=True 时文章只读元数据，正文留在库中按需读取
+        with self.lock:
+            frontier = [r[0] for r in self.conn.execute("SELECT url FROM frontier WHERE site=? ORDER BY rowid", (site,))]
+            visited = {r[0] for r in self.conn.execute("SELECT url FROM visited WHERE site=?", (site,))}
+            if lazy:
+                arts = [StoredArticle(self, site, title=r[0], url=r[1], text_len=r[2]) for r in self.conn.execute(
+                    "SELECT title,url,length(content_text) FROM articles WHERE site=? ORDER BY seq", (site,))]
+            else:
+                arts = [{"title":r[0],"url":r[1],"content":r[2],"content_text":r[3]} for r in self.conn.execute(
+                    "SELECT title,url,content,content_text FROM articles WHERE site=? ORDER BY seq", (site,))]
+        return frontier, visited, arts
+
+    def enqueue(self, site, urls):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO frontier VALUES(?,?)", [(site,u) for u in urls])
+
+    def discard(self, site, url):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM frontier WHERE site=? AND url=?", (site,url))
+
+    def complete(self, site, url, article, links, seq=0, replaced=None):
+        # 一个页面的结果在同一事务内落盘：出队、标记已访问、保存文章（可替换重复文章）、新链接入队
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM frontier WHERE site=? AND url=?", (site,url))
+            if replaced:
+                self.conn.execute("DELETE FROM articles WHERE site=? AND url=?", (site,replaced))
+            self.conn.execute("INSERT OR IGNORE INTO visited VALUES(?,?)", (site,url_key(url)))
+            if article:
+                self.conn.execute("INSERT OR REPLACE INTO articles VALUES(?,?,?,?,?,?)",
+                                  (site,article["url"],seq,article["title"],article["content"],article["content_text"]))
+            self.conn.executemany("INSERT OR IGNORE INTO frontier VALUES(?,?)", [(site,l) for l in links])
+
+    def get_body(self, site, url):
+        with self.lock:
+            row = self.conn.execute("SELECT content,content_text FROM articles WHERE site=? AND url=?", (site,url)).fetchone()
+        if not row:
+            raise KeyError(url)
+        return {"content":row[0],"content_text":row[1]}
+
+    def lazy(self, site, article):
+        # 文章已由 complete() 写入 articles 表：换成只含元数据的 StoredArticle，正文不再常驻内存
+        return StoredArticle(self, site, title=article["title"], url=article["url"],
+                             text_len=len(article["content_text"]),
+                             body_hash=hashlib.md5(article["content"].encode("utf-8")).hexdigest())
+
+    # pages 表跨多次抓取保留，供增量抓取复用
+    def get_page(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT etag,last_modified,content_hash,article,links FROM pages WHERE url=?", (url,)).fetchone()
+        if not row:
+            return None
+        return {"etag":row[0],"last_modified":row[1],"content_hash":row[2],
+                "article":json.loads(row[3]) if row[3] else None,"links":json.loads(row[4] or "[]")}
+
+    def save_page(self, url, etag, last_modified, content_hash, article, links):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES(?,?,?,?,?,?)",
+                              (url,etag,last_modified,content_hash,json.dumps(article,ensure_ascii=False) if article else None,json.dumps(links)))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# ---------------------- 文章正文存储 ----------------------
+class StoredArticle(dict):
+    # 内存中只保留标题、URL、正文长度等元数据；content / content_text 按需从 CrawlStore 的 articles 表读取
+    def __init__(self, store, site, **meta):
+        super().__init__(**meta)
+        self.store = store
+        self.site = site
+
+    def __missing__(self, key):
+        if key in ("content","content_text"):
+            return self.store.get_body(self.site, self["url"])[key]
+        raise KeyError(key)
+
+def article_length(article):
+    return article["text_len"] if "text_len" in article else len(article["content_text"])
+
+# ---------------------- 礼貌抓取（限速 / robots.txt） ----------------------
+class HostState:
+    def __init__(self, rate, burst, limit):
+        self.rate = self.base_rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.limit = limit
+        self.inflight = 0
+        self.blocked_until = 0.0
+        self.latency = None
+        self.robots = None
+        self.fixed_rate = False
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens+(now-self.updated)*self.rate)
+        self.updated = now
+
+class PolitenessScheduler:
+    # 每个主机一个令牌桶：遵守 robots.txt 与 Crawl-delay，429/503 按 Retry-After 退避并减半速率和并发，
+    # 响应稳定且延迟低时逐步提高并发（加性增、乘性减）
+    def __init__(self, max_concurrency=None, rate=None, burst=None):
+        self.max_concurrency = max(1, max_concurrency or CRAWL_WORKERS)
+        self.rate = rate or POLITE_RATE
+        self.burst = burst or POLITE_BURST
+        self.hosts = {}
+        self.cond = threading.Condition()
+        self.robots_lock = threading.Lock()
+
+    def _host(self, url):
+        netloc = urlparse(url).netloc.lower()
+        state = self.hosts.get(netloc)
+        if state is None:
+            state = self.hosts[netloc] = HostState(self.rate, self.burst, min(POLITE_START_CONCURRENCY, self.max_concurrency))
+        return state
+
+    def robots(self, url):
+        # robots.txt 每个主机只抓取、解析一次
+        with self.cond:
+            state = self._host(url)
+        if state.robots is not None:
+            return state.robots
+        with self.robots_lock:
+            if state.robots is None:
+                rp = load_robots(url)
+                delay = rp.crawl_delay(HTTP_HEADERS["User-Agent"])
+                with self.cond:
+                    if delay:
+                        state.rate = state.base_rate = 1.0/float(delay)
+                        state.burst = 1
+                        state.tokens = min(state.tokens, 1.0)
+                        state.fixed_rate = True
+                    state.robots = rp
+        return state.robots
+
+    def allowed(self, url):
+        return self.robots(url).can_fetch(HTTP_HEADERS["User-Agent"], url)
+
+    def acquire(self, url):
+        with self.cond:
+            state = self._host(url)
+            while True:
+                now = time.monotonic()
+                state.refill(now)
+                if now>=state.blocked_until and state.inflight<state.limit and state.tokens>=1:
+                    state.tokens -= 1
+                    state.inflight += 1
+                    return
+                waits = [0.05]
+                if state.blocked_until>now:
+                    waits.append(state.blocked_until-now)
+                if state.tokens<1:
+                    waits.append((1-state.tokens)/state.rate)
+                self.cond.wait(max(waits))
+
+    def release(self, url, response, latency):
+        with self.cond:
+            state = self._host(url)
+            state.inflight -= 1
+            status = response.status_code if response is not None else None
+            if status in (429,503):
+                wait = retry_after_seconds(response.headers.get("Retry-After"))
+                if wait is None:
+                    wait = min(POLITE_MAX_BACKOFF, 2.0/state.rate)
+                state.blocked_until = time.monotonic()+min(wait, POLITE_MAX_BACKOFF)
+                state.limit = max(1, state.limit//2)
+                state.rate = max(state.base_rate/16, state.rate/2)
+            elif status is not None:
+                state.latency = latency if state.latency is None else 0.8*state.latency+0.2*latency
+                if state.latency<POLITE_TARGET_LATENCY:
+                    if state.limit<self.max_concurrency:
+                        state.limit += 1
+                    if not state.fixed_rate:
+                        state.rate = min(state.base_rate, state.rate*1.1)
+                elif state.latency>2*POLITE_TARGET_LATENCY and state.limit>1:
+                    state.limit -= 1
+            self.cond.notify_all()
+
+def load_robots(url):
+    parsed = urlparse(url)
+    rp = RobotFileParser()
+    try:
+        r = get_session().get(f"{parsed.scheme}://{parsed.netloc}/robots.txt", timeout=10, verify=False)
+        if r.status_code in (401,403):
+            rp.disallow_all = True
+        elif r.status_code>=400:
+            rp.allow_all = True
+        else:
+            rp.parse(r.text.splitlines())
+    except Exception:
+        rp.allow_all = True
+    return rp
+
+def retry_after_seconds(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp()-time.time())
+    except (TypeError, ValueError):
+        return None
+
+# ---------------------- 站点地图 / 订阅源发现 ----------------------
+def parse_lastmod(value):
+    # sitemap 的 W3C 日期与 RSS 的 RFC 822 日期统一转为时间戳，无法解析时返回 None
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        dt = datetime.fromisoformat(value.replace("Z","+00:00"))
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _local_name(el):
+    return lxml.etree.QName(el).localname if isinstance(el.tag, str) else ""
+
+def _child_text(el, *names):
+    for child in el:
+        if _local_name(child) in names and child.text:
+            return child.text.strip()
+    return None
+
+def open_xml_stream(url, polite=None):
+    # 流式读取 sitemap / 订阅源，.xml.gz 与 Content-Encoding: gzip 均透明解压
+    if polite:
+        if not polite.allowed(url):
+            return None
+        polite.acquire(url)
+    start = time.monotonic()
+    r = None
+    try:
+        r = get_session().get(url, timeout=15, verify=False, stream=True)
+    except Exception as e:
+        append_log(f"❌ 请求失败: {url} ({e})")
+        return None
+    finally:
+        if polite:
+            polite.release(url, r, time.monotonic()-start)
+    if r.status_code!=200:
+        r.close()
+        return None
+    r.raw.decode_content = True
+    r.raw.auto_close = False
+    stream = io.BufferedReader(r.raw, 65536)
+    if stream.peek(2)[:2]==b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+    return stream
+
+def iter_xml_links(stream):
+    # 逐个元素解析并立即释放，内存占用与文件大小无关；
+    # 产出 ("sitemap", url, None) 或 ("page", url, lastmod)
+    for _, el in lxml.etree.iterparse(stream, events=("end",), recover=True, resolve_entities=False, no_network=True):
+        name = _local_name(el)
+        if name=="sitemap":
+            loc = _child_text(el, "loc")
+            if loc:
+                yield "sitemap", loc, None
+        elif name in ("url","item"):
+            loc = _child_text(el, "loc", "link")
+            if loc:
+                yield "page", loc, parse_lastmod(_child_text(el, "lastmod", "pubDate", "date"))
+        elif name=="entry":
+            loc = None
+            for child in el:
+                if _local_name(child)=="link" and child.get("rel","alternate")=="alternate" and child.get("href"):
+                    loc = child.get("href")
+                    break
+            if loc:
+                yield "page", loc, parse_lastmod(_child_text(el, "updated", "published"))
+        else:
+            continue
+        el.clear()
+        parent = el.getparent()
+        while parent is not None and el.getprevious() is not None:
+            del parent[0]
+
+def discover_seeds(base_url, polite=None, max_urls=None, sources=None):
+    # 种子阶段：默认读取 robots.txt 中的 Sitemap 或 sitemap.xml（含索引与 gzip），也可传入订阅源地址；
+    # 返回 {url: lastmod}，同域链接，按文件出现顺序
+    max_urls = max_urls or SITEMAP_MAX_URLS
+    if sources is None:
+        parsed = urlparse(base_url)
+        robots = polite.robots(base_url) if polite else load_robots(base_url)
+        sources = robots.site_maps() or [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+    sources = deque(sources)
+    base_domain = url_domain(base_url)
+    seen_sources = set()
+    seeds = {}
+    while sources and len(seen_sources)<SITEMAP_MAX_FILES and len(seeds)<max_urls:
+        source = sources.popleft()
+        if source in seen_sources:
+            continue
+        seen_sources.add(source)
+        stream = open_xml_stream(source, polite)
+        if stream is None:
+            continue
+        try:
+            for kind, loc, lastmod in iter_xml_links(stream):
+                # 畸形的 <loc> 只跳过这一条
+                loc = absolute_link(source, loc)
+                if loc is None:
+                    continue
+                if kind=="sitemap":
+                    sources.append(loc)
+                elif url_domain(loc)==base_domain and loc not in seeds:
+                    seeds[loc] = lastmod
+                    if len(seeds)>=max_urls:
+                        break
+        except Exception as e:
+            append_log(f"⚠️ 解析站点地图失败: {source} ({e})")
+        finally:
+            stream.close()
+    return seeds
+
 # ---------------------- 全站抓取 ----------------------
-def get_all_links(base_url):
-    to_visit = [base_url]
+_DATE_PATH_RE = re.compile(r"/(19|20)\d{2}/(0?[1-9]|1[0-2])(/|$)|(19|20)\d{2}-\d{2}-\d{2}")
+_SLUG_RE = re.compile(r"[^/]*[a-z0-9\u4e00-\u9fff]+[-_][a-z0-9\u4e00-\u9fff]+[-_][^/]*|[^/]+\.s?html?", re.I)
+_ID_RE = re.compile(r"\d{3,}(\.s?html?)?")
+_NON_ARTICLE_SEGMENTS = {"tag","tags","category","categories","cat","author","authors","page","search","login","logout",
+                         "signin","signup","register","account","user","cart","wp-admin","wp-login.php","feed","rss",
+                         "comment","comments","archive","archives","label","topics","about","contact","privacy","terms"}
+_NON_HTML_RE = re.compile(r"\.(jpe?g|png|gif|webp|svg|ico|css|js|pdf|zip|rar|7z|gz|mp[34]|avi|mov|xml|json|txt)$", re.I)
+_NAV_ANCHORS = {"next","prev","previous","more","home","login","登录","注册","首页","上一页","下一页","更多","返回"}
+
+def url_pattern(url):
+    # 站内统计的分组键：首段路径（数字归一）、深度、末段形态
+    segs = [seg for seg in urlparse(url).path.split("/") if seg]
+    if not segs:
+        return "/"
+    last = segs[-1]
+    kind = "num" if _ID_RE.fullmatch(last) else "slug" if _SLUG_RE.fullmatch(last) else "word"
+    return f"{re.sub(r'[0-9]+', '0', segs[0].lower())}/{len(segs)}/{kind}"
+
+def url_score(url, anchor="", from_article=False):
+    # 只用 URL、锚文本与来源页面的廉价特征估计“像文章”的程度，越大越优先
+    path = urlparse(url).path
+    if _NON_HTML_RE.search(path):
+        return -5.0
+    segs = [seg.lower() for seg in path.split("/") if seg]
+    score = 0.0
+    if not segs:
+        score -= 1
+    elif len(segs)>5:
+        score -= 0.5
+    elif len(segs)>=2:
+        score += 0.5
+    if _NON_ARTICLE_SEGMENTS.intersection(segs):
+        score -= 2.5
+    if _DATE_PATH_RE.search(path):
+        score += 2
+    if segs and _SLUG_RE.fullmatch(segs[-1]):
+        score += 1.5
+    elif segs and _ID_RE.fullmatch(segs[-1]):
+        score += 1
+    anchor = anchor.strip()
+    if anchor.lower() in _NAV_ANCHORS or anchor.isdigit():
+        score -= 1
+    elif len(anchor)>=15 or (len(anchor)>=6 and re.search("[\u4e00-\u9fff]", anchor)):
+        score += 1
+    if from_article:
+        score += 0.5
+    return score
+
+class Frontier:
+    # 优先级待抓队列：入队时去重，按静态特征分 + 站内统计分出队（同分先进先出）；
+    # 统计分随抓取结果变化，每 PRIORITY_RESCORE_EVERY 次反馈整体重排一次
+    def __init__(self, urls=(), seen=(), priority=None):
+        self.heap = []
+        self.seen = set(seen)
+        self.seq = 0
+        self.priority = PRIORITY_FRONTIER if priority is None else priority
+        self.stats = {}
+        self.feedback = 0
+        for url in urls:
+            self.push(url)
+
+    def push(self, url, anchor="", from_article=False, boost=0.0):
+        key = url_key(url)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        static = url_score(url, anchor, from_article)+boost if self.priority else 0.0
+        pattern = url_pattern(url) if self.priority else None
+        self.seq += 1
+        heapq.heappush(self.heap, (-(static+self._learned(pattern)), self.seq, url, static, pattern))
+        return True
+
+    def pop(self):
+        return heapq.heappop(self.heap)[2]
+
+    def _learned(self, pattern):
+        # 同一 URL 形态的历史命中率（拉普拉斯平滑后的对数几率）
+        if pattern is None or pattern not in self.stats:
+            return 0.0
+        good, bad = self.stats[pattern]
+        return math.log((good+1)/(bad+1))
+
+    def record(self, url, good):
+        if not self.priority:
+            return
+        pattern = url_pattern(url)
+        counts = self.stats.setdefault(pattern, [0,0])
+        counts[0 if good else 1] += 1
+        self.feedback += 1
+        if self.feedback%PRIORITY_RESCORE_EVERY==0:
+            self.heap = [(-(static+self._learned(pattern)), seq, url, static, pattern)
+                         for _, seq, url, static, pattern in self.heap]
+            heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+def crawl_page(url, cache=None, extract=parse_page, polite=None, lastmod=None):
+    if polite and not polite.allowed(url):
+        append_log(f"🚫 robots.txt 禁止抓取: {url}")
+        return None, []
+    if cache is None:
+        r = fetch_response(url, polite=polite)
+        if r is None:
+            return None, []
+        return extract(url, r.text)
+    # 增量模式：条件请求，304 或内容哈希未变时直接复用上次的提取结果
+    cached = cache.get_page(url)
+    if cached and lastmod and cached["last_modified"]:
+        # sitemap 的 lastmod 不晚于上次的 Last-Modified：无需请求
+        previous = parse_lastmod(cached["last_modified"])
+        if previous and lastmod<=previous:
+            return cached["article"], cached["links"]
+    headers = {}
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+    r = fetch_response(url, headers, polite)
+    if r is None:
+        return None, []
+    if r.status_code==304 and cached:
+        return cached["article"], cached["links"]
+    digest = hashlib.md5(r.content).hexdigest()
+    if cached and cached["content_hash"]==digest:
+        article, links = cached["article"], cached["links"]
+    else:
+        article, links = extract(url, r.text)
+        if article and "ai_html" in article:
+            # 待 AI 补全的页面不缓存中间结果，下次由 AI 结果缓存兜底
+            return article, links
+    cache.save_page(url, r.headers.get("ETag"), r.headers.get("Last-Modified"), digest, article, links)
+    return article, links
+
+def get_all_links(base_url, workers=None, store=None, resume=False, incremental=None, processes=None, visited=None, on_article=None, lazy_bodies=False, polite=None, discover=None):
+    # 调度线程独占 visited / frontier，工作线程只负责下载与解析；visited 默认为全局 visited_links
+    if visited is None:
+        visited = visited_links
+    workers = max(1, workers or CRAWL_WORKERS)
+    if processes is None:
+        processes = EXTRACT_PROCESSES
+    if incremental is None:
+        incremental = INCREMENTAL_CRAWL
+    if discover is None:
+        discover = SITEMAP_DISCOVERY
+    cache = store if store and incremental else None
+    # 断点记录按规范化的站点 URL 保存，http/https、末尾斜杠等写法不同也能续抓
+    site = normalize_url(base_url)
+    start_urls = [site]
     all_articles = []
-    count = 0
-    while to_visit and len(all_articles)<MAX_PAGES:
-        url = to_visit.pop(0)
-        normalized = normalize_url(url)
-        if normalized in visited_links:
-            continue
-        visited_links.add(normalized)
-        article = extract_article(url)
-        if article:
-            all_articles.append(article)
-            count += 1
-            append_log(f"📄 抓取: {article['title']}")
-            update_progress(count/MAX_PAGES*100)
-            try:
-                soup = BeautifulSoup(requests.get(url, headers={'User-Agent':'Mozilla/5.0'}, verify=False).text,"html.parser")
-                for a in soup.find_all("a", href=True):
-                    link = normalize_url(urljoin(url, a["href"]))
-                    if is_same_domain(base_url, link) and link not in visited_links:
-                        to_visit.append(link)
-            except:
-                pass
-    all_articles = deduplicate_articles(all_articles)
+    if store:
+        if resume:
+            start_urls, done_links, all_articles = store.load(site, lazy_bodies)
+            if not start_urls and not all_articles:
+                append_log("♻️ 没有可续抓的记录，从头开始抓取")
+                resume = False
+                start_urls = [site]
+            else:
+                visited.update(done_links)
+                append_log(f"♻️ 断点续抓: 已完成 {len(done_links)} 页，待抓 {len(start_urls)} 页")
+        if not resume:
+            store.reset(site)
+    to_visit = Frontier(start_urls, seen=visited)
+    base_domain = url_domain(base_url)
+    count = len(all_articles)
+    pending = {}
+    dedup = NearDuplicateIndex()
+    for i,a in enumerate(all_articles):
+        dedup.add(i, minhash_signature(a["content_text"]))
+        if on_article:
+            on_article(i, a)
+    if polite is None and POLITE_CRAWL:
+        polite = PolitenessScheduler(workers)
+    lastmods = {}
+
+    def add_seeds(found, source):
+        # 站点地图 / 订阅源中的文章直接入队，最新的优先；链接遍历仍从首页开始补充
+        lastmods.update(found)
+        seeds = sorted(found, key=lambda u: -(found[u] or 0))
+        seeds = [u for u in seeds if to_visit.push(u, boost=1.0)]
+        if store:
+            store.enqueue(site, seeds)
+        if seeds:
+            append_log(f"🗺️ 从{source}发现 {len(seeds)} 个链接")
+
+    if discover and not resume:
+        add_seeds(discover_seeds(base_url, polite), "站点地图")
+
+    def queue_links(links, from_article):
+        new_links = []
+        for link in links:
+            # 旧版缓存中的链接没有锚文本
+            link, anchor = (link, "") if isinstance(link, str) else link
+            if url_domain(link)==base_domain and to_visit.push(link, anchor, from_article):
+                new_links.append(link)
+        return new_links
+    extractor = ProcessExtractor(processes) if processes>0 else None
+    ai_queue = AIExtractQueue() if GEMINI_API_KEY else None
+    extract = partial(extractor or parse_page, ai_fallback=ai_queue is None)
+    fetching = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while (to_visit or pending) and len(all_articles)<MAX_PAGES:
+                while to_visit and fetching<workers and len(all_articles)+len(pending)<MAX_PAGES:
+                    url = to_visit.pop()
+                    key = url_key(url)
+                    if key in visited:
+                        if store:
+                            store.discard(site, url)
+                        continue
+                    visited.add(key)
+                    pending[pool.submit(crawl_page, url, cache, extract, polite, lastmods.get(url))] = (url, None)
+                    fetching += 1
+                if not pending:
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    url, ai_links = pending.pop(fut)
+                    if ai_links is None:
+                        fetching -= 1
+                        article, links = fut.result()
+                        if article and "ai_html" in article:
+                            # 正文过短：交给 AI 队列，完成后再走去重与链接展开
+                            html = article.pop("ai_html")
+                            pending[ai_queue.submit(url, article, html)] = (url, links)
+                            continue
+                    else:
+                        article, links = fut.result(), ai_links
+                    if len(all_articles)>=MAX_PAGES:
+                        continue
+                    feed_links = article.pop("feeds", None) if article else None
+                    if feed_links and discover and not resume and url_key(url)==url_key(base_url):
+                        add_seeds(discover_seeds(base_url, polite, sources=feed_links), "订阅源")
+                    if article and url_key(article["url"])!=url_key(url):
+                        # 页面声明了另一个规范 URL：已抓过则丢弃正文但仍展开链接（如 ?page=2 指向第一页），
+                        # 否则把规范 URL 标记为已访问
+                        canonical = url_key(article["url"])
+                        if canonical in visited:
+                            append_log(f"🔁 规范 URL 已抓取，只展开链接: {url}")
+                            to_visit.record(url, False)
+                            new_links = queue_links(links, False)
+                            if store:
+                                store.complete(site, url, None, new_links)
+                            continue
+                        visited.add(canonical)
+                    if not article:
+                        to_visit.record(url, False)
+                        if store:
+                            store.complete(site, url, None, [])
+                        continue
+                    # 在线去重：重复内容不占页数预算，也不展开其链接
+                    slot, status = merge_duplicate(dedup, all_articles, article)
+                    if status!="new":
+                        to_visit.record(url, False)
+                        kept = all_articles[slot]
+                        if status=="replaced":
+                            if store:
+                                store.complete(site, url, article, [], slot+1, replaced=kept["url"])
+                                if lazy_bodies:
+                                    article = store.lazy(site, article)
+                            all_articles[slot] = article
+                            append_log(f"🔁 重复页面，保留较长版本: {url}")
+                            if on_article:
+                                on_article(slot, article)
+                        else:
+                            append_log(f"🔁 重复页面，已跳过: {url}")
+                            if store:
+                                store.complete(site, url, None, [])
+                        continue
+                    count += 1
+                    from_article = article_length(article)>=PRIORITY_ARTICLE_CHARS
+                    to_visit.record(url, from_article)
+                    new_links = queue_links(links, from_article)
+                    if store:
+                        store.complete(site, url, article, new_links, count)
+                        if lazy_bodies:
+                            # 正文已随本页结果写入 SQLite，内存中只留元数据
+                            article = store.lazy(site, article)
+                    all_articles.append(article)
+                    if on_article:
+                        on_article(len(all_articles)-1, article)
+                    append_log(f"📄 抓取: {article['title']}")
+                    update_progress(count/MAX_PAGES*100)
+            for fut in pending:
+                fut.cancel()
+    finally:
+        if extractor:
+            extractor.shutdown()
+        if ai_queue:
+            ai_queue.shutdown()
     update_progress(100)
     return all_articles
 
 # ---------------------- RSS生成 ----------------------
-def generate_rss(base_url, articles):
-    fg = FeedGenerator()
-    fg.title(f"{base_url} 全站 RSS")
-    fg.link(href=base_url)
-    fg.description("自动生成全站RSS")
-    for art in articles:
-        fe = fg.add_entry()
-        fe.title(art["title"])
-        fe.link(href=art["url"])
-        fe.content(art["content"], type="CDATA")
-    rss_str = fg.rss_str(pretty=True).decode("utf-8")
-    with open(RSS_FILENAME,"w",encoding="utf-8") as f:
-        f.write(rss_str)
-    append_log(f"📄 RSS 已生成: {RSS_FILENAME}")
+_XML_INVALID_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _xml_text(text):
+    return escape(_XML_INVALID_RE.sub("", text))
+
+def _xml_cdata(text):
+    return "<![CDATA[" + _XML_INVALID_RE.sub("", text).replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+class FeedWriter:
+    # 每篇文章的 <item> 只序列化一次，按内容哈希缓存；重新生成时只渲染变化的条目，
+    # 频道头尾仍由 feedgen 生成，拼接结果与原先 FeedGenerator 的输出格式一致
+    # 片段缓存按 LRU 淘汰，总大小不超过 max_bytes
+    def __init__(self, max_bytes=None):
+        self.items = OrderedDict()
+        self.size = 0
+        self.max_bytes = FEED_CACHE_BYTES if max_bytes is None else max_bytes
+
+    def item(self, art):
+        # 落盘文章直接用正文哈希，命中缓存时无需从库中读回正文
+        body = art["body_hash"] if "body_hash" in art else art["content"]
+        digest = hashlib.md5((art["title"]+"\0"+art["url"]+"\0"+body).encode("utf-8")).hexdigest()
+        cached = self.items.get(art["url"])
+        if cached and cached[0]==digest:
+            self.items.move_to_end(art["url"])
+            return cached[1]
+        fragment = ("    <item>\n"
+                    f"      <title>{_xml_text(art['title'])}</title>\n"
+                    f"      <link>{_xml_text(art['url'])}</link>\n"
+                    f"      <description>{_xml_cdata(art['content'])}</description>\n"
+                    "    </item>\n")
+        self._drop(art["url"])
+        self.items[art["url"]] = (digest, fragment)
+        self.size += len(fragment)
+        while self.size>self.max_bytes and len(self.items)>1:
+            self._drop(next(iter(self.items)))
+        return fragment
+
+    def _drop(self, url):
+        cached = self.items.pop(url, None)
+        if cached:
+            self.size -= len(cached[1])
+
+    def channel(self, base_url):
+        fg = FeedGenerator()
+        fg.title(f"{base_url} 全站 RSS")
+        fg.link(href=base_url)
+        fg.description("自动生成全站RSS")
+        xml = fg.rss_str(pretty=True).decode("utf-8")
+        i = xml.rindex("  </channel>")
+        return xml[:i], xml[i:]
+
+    def chunks(self, base_url, articles):
+        head, tail = self.channel(base_url)
+        yield head
+        # feedgen 的 add_entry 默认前插，保持原有的倒序输出
+        for art in reversed(articles):
+            yield self.item(art)
+        yield tail
+
+    def prune(self, articles):
+        urls = {a["url"] for a in articles}
+        for url in list(self.items):
+            if url not in urls:
+                self._drop(url)
+
+feed_writer = FeedWriter()
+
+def generate_rss(base_url, articles, path=None, stream=False, writer=None):
+    # stream=True 时逐条写入磁盘，不在内存中拼出整个文档，返回 None；发布时用 publish_feed(site_id, path=path)
+    path = path or RSS_FILENAME
+    writer = writer or feed_writer
+    writer.prune(articles)
+    rss_str = None
+    with open(path,"w",encoding="utf-8") as f:
+        if stream:
+            for chunk in writer.chunks(base_url, articles):
+                f.write(chunk)
+        else:
+            rss_str = "".join(writer.chunks(base_url, articles))
+            f.write(rss_str)
+    append_log(f"📄 RSS 已生成: {path}")
     return rss_str
 
 # ---------------------- 本地 RSS 服务 ----------------------
+_LAST_BUILD_RE = re.compile(rb"<lastBuildDate>[^<]*</lastBuildDate>")
+
+def feed_etag(rss):
+    # feedgen 每次生成都会写入新的 lastBuildDate，计算 ETag 时忽略它，文章不变则 ETag 不变；rss 可为 str 或 UTF-8 字节
+    if isinstance(rss, str):
+        rss = rss.encode("utf-8")
+    return f'"{hashlib.md5(_LAST_BUILD_RE.sub(b"", rss, count=1)).hexdigest()}"'
+
+class FeedBody:
+    # 发布时一次性编码并压缩，请求时直接写出预先生成的字节
+    def __init__(self, rss, modified=None):
+        raw = rss.encode("utf-8") if isinstance(rss, str) else rss
+        self.bodies = {"identity": raw, "gzip": gzip.compress(raw, RSS_GZIP_LEVEL)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(raw)
+        self.etag = feed_etag(raw)
+        # 各编码的字节不同，强 ETag 按编码加后缀区分；self.etag 为未压缩版本的 ETag
+        self.etags = {enc: self.etag if enc=="identity" else f'{self.etag[:-1]}-{enc}"' for enc in self.bodies}
+        self.modified = int(modified or time.time())
+        self.last_modified = formatdate(self.modified, usegmt=True)
+
+    def negotiate(self, accept_encoding):
+        accepted = {}
+        for part in (accept_encoding or "").split(","):
+            name, _, params = part.strip().partition(";")
+            q = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    q = float(params.strip()[2:])
+                except ValueError:
+                    q = 0.0
+            if name:
+                accepted[name.lower()] = q
+        for encoding in ("br","gzip"):
+            if encoding in self.bodies and accepted.get(encoding, accepted.get("*", 0))>0:
+                return encoding
+        return "identity"
+
+    def not_modified(self, headers):
+        inm = headers.get("If-None-Match")
+        if inm is not None:
+            tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+            return "*" in tags or any(etag in tags for etag in self.etags.values())
+        ims = headers.get("If-Modified-Since")
+        if ims:
+            try:
+                return parsedate_to_datetime(ims).timestamp()>=self.modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+def make_site_id(base_url):
+    parsed = urlparse(base_url if "://" in base_url else "http://"+base_url)
+    raw = parsed.netloc.lower().removeprefix("www.") + parsed.path.rstrip("/")
+    return re.sub(r"[^a-z0-9._-]+", "-", raw.lower()).strip("-") or "site"
+
+def publish_feed(site_id, rss_str=None, path=None):
+    # 先完成编码压缩，再一次性替换字典中的引用；重新抓取期间旧版本持续可读
+    # 内容未变时沿用旧的 FeedBody，ETag 与 Last-Modified 保持不变，阅读器继续收到 304
+    global rss_cache
+    rss = rss_str
+    if rss is None:
+        # 流式生成的 RSS 只在磁盘上，按字节读取一次，不再解码后重新编码
+        with open(path or RSS_FILENAME, "rb") as f:
+            rss = f.read()
+    body = feeds.get(site_id)
+    if body is None or body.etag!=feed_etag(rss):
+        body = FeedBody(rss)
+    feeds[site_id] = body
+    rss_cache = body
+    return body
+
 class RSSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
     def do_GET(self):
-        global rss_cache
-        if self.path=="/rss":
-            if not rss_cache:
-                self.send_response(503)
-                self.end_headers()
-                self.wfile.write(b"RSS not ready")
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def _send_text(self, status, body, head):
+        self.send_response(status)
+        self.send_header("Content-Type","text/plain; charset=utf-8")
+        self.send_header("Content-Length",str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _send_json(self, data, head):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type","application/json; charset=utf-8")
+        self.send_header("Content-Length",str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _serve(self, head):
+        path = self.path.split("?")[0].rstrip("/")
+        if path=="/rss":
+            feed = rss_cache
+        elif path.startswith("/rss/"):
+            feed = feeds.get(path[len("/rss/"):])
+            if feed is None:
+                self._send_text(404, b"Unknown feed", head)
                 return
-            self.send_response(200)
-            self.send_header("Content-Type","application/rss+xml; charset=utf-8")
-            self.end_headers()
-            self.wfile.write(rss_cache.encode("utf-8"))
+        elif path=="/feeds":
+            listing = [{"id":k,"url":f"/rss/{k}","last_modified":v.last_modified} for k,v in sorted(feeds.items())]
+            self._send_json(listing, head)
+            return
         else:
-            self.send_response(404)
+            self._send_text(404, b"Not Found", head)
+            return
+        if feed is None:
+            self._send_text(503, b"RSS not ready", head)
+            return
+        encoding = feed.negotiate(self.headers.get("Accept-Encoding"))
+        if feed.not_modified(self.headers):
+            self.send_response(304)
+            self.send_header("ETag",feed.etags[encoding])
+            self.send_header("Last-Modified",feed.last_modified)
+            self.send_header("Vary","Accept-Encoding")
             self.end_headers()
-            self.wfile.write(b"Not Found")
+            return
+        body = feed.bodies[encoding]
+        self.send_response(200)
+        self.send_header("Content-Type","application/rss+xml; charset=utf-8")
+        self.send_header("Content-Length",str(len(body)))
+        self.send_header("ETag",feed.etags[encoding])
+        self.send_header("Last-Modified",feed.last_modified)
+        self.send_header("Vary","Accept-Encoding")
+        if encoding!="identity":
+            self.send_header("Content-Encoding",encoding)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+rss_server = None   # 本地 RSS 服务启动后才有订阅地址可提示
 
-def start_rss_server():
-    server = HTTPServer(("localhost",8000),RSSHandler)
+def start_rss_server(host=None, port=None):
+    # 多线程服务，多个阅读器并发轮询互不阻塞
+    global LOCAL_RSS_URL, rss_server
+    host = host or RSS_SERVER_HOST
+    port = port or RSS_SERVER_PORT
+    server = ThreadingHTTPServer((host,port),RSSHandler)
+    LOCAL_RSS_URL = f"http://{host}:{port}/rss"
+    rss_server = server
     append_log(f"📡 本地 RSS 服务: {LOCAL_RSS_URL}")
     server.serve_forever()
 
+# ---------------------- 站点抓取流程 ----------------------
+feed_writers = {}   # site_id -> FeedWriter，各站点的条目缓存互不干扰
+_crawl_store = None
+_crawl_store_lock = threading.Lock()
+
+def get_crawl_store():
+    # 各站点共用一个 CrawlStore 且不关闭：抓取结束后文章正文仍按需从中读取
+    global _crawl_store
+    if _crawl_store is None:
+        with _crawl_store_lock:
+            if _crawl_store is None:
+                _crawl_store = CrawlStore()
+    return _crawl_store
+
+def crawl_site(url, resume=False, path=None, workers=None, on_article=None):
+    # 抓取 -> 生成 RSS -> 发布到本地服务；图形界面和无界面模式共用
+    # 每次抓取使用独立的已访问集合，多个站点可以并行抓取
+    site_id = make_site_id(url)
+    arts = get_all_links(url, workers=workers, store=get_crawl_store(), resume=resume, visited=set(),
+                         on_article=on_article, lazy_bodies=True)
+    append_log(f"✅ 抓取完成，共 {len(arts)} 篇文章")
+    writer = feed_writers.setdefault(site_id, FeedWriter())
+    path = path or RSS_FILENAME
+    publish_feed(site_id, generate_rss(url, arts, path=path, stream=RSS_STREAM, writer=writer), path=path)
+    if rss_server:
+        append_log(f"📡 本站订阅地址: {LOCAL_RSS_URL}/{site_id}")
+    return arts
+
+# ---------------------- 定时重抓 ----------------------
+class CrawlScheduler:
+    # 按站点间隔周期重抓：间隔带随机抖动，全局并发上限，上一轮未结束则跳过本轮
+    def __init__(self, sites, max_concurrent=None, jitter=None, output_dir=None, workers=None):
+        self.sites = {s["url"]: s for s in sites}
+        self.jitter = SCHEDULE_JITTER if jitter is None else jitter
+        self.output_dir = output_dir or FEEDS_DIR
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrent or SCHEDULE_MAX_CONCURRENT))
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def _delay(self, site):
+        interval = site.get("interval") or SCHEDULE_INTERVAL
+        return max(1, interval*(1+random.uniform(-self.jitter, self.jitter)))
+
+    def _run(self, site):
+        url = site["url"]
+        try:
+            with self.slots:
+                append_log(f"⏰ 定时抓取: {url}")
+                path = os.path.join(self.output_dir, f"{make_site_id(url)}.xml")
+                crawl_site(url, path=path, workers=self.workers)
+        except Exception as e:
+            append_log(f"❌ 定时抓取失败: {url} ({e})")
+        finally:
+            with self.lock:
+                self.running.discard(url)
+
+    def trigger(self, url):
+        with self.lock:
+            if url in self.running:
+                append_log(f"⏭️ 上一轮仍在进行，跳过: {url}")
+                return False
+            self.running.add(url)
+        threading.Thread(target=self._run, args=(self.sites[url],), daemon=True).start()
+        return True
+
+    def run_forever(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        # 首轮在一个抖动窗口内错开启动，避免所有站点同时开抓
+        now = time.time()
+        queue = [(now+random.uniform(0, self.jitter*(s.get("interval") or SCHEDULE_INTERVAL)), url) for url,s in self.sites.items()]
+        heapq.heapify(queue)
+        while queue and not self.stopped.is_set():
+            due, url = queue[0]
+            if self.stopped.wait(max(0, due-time.time())):
+                break
+            heapq.heapreplace(queue, (time.time()+self._delay(self.sites[url]), url))
+            self.trigger(url)
+
+    def stop(self):
+        self.stopped.set()
+
+def load_sites(path):
+    # JSON 列表：[{"url": "https://example.com", "interval": 3600}, ...]
+    with open(path, encoding="utf-8") as f:
+        sites = json.load(f)
+    return [{"url": s} if isinstance(s, str) else s for s in sites]
+
 # ---------------------- GUI ----------------------
 html_template = """<html>
 <head><meta charset="utf-8"><style>
@@ -216,17 +1746,43 @@ body{font-family:'Segoe UI',sans-serif;margin:0;padding:0;height:100%;background
 #progress{width:100%;height:20px;margin-bottom:5px;}
 #progress_text{margin-bottom:5px;}
 #log{height:120px;overflow:auto;border:1px solid #ccc;padding:5px;background:#fff;margin-bottom:10px;flex-shrink:0;}
-#article_list{list-style:none;padding-left:0;overflow:auto;flex:1;background:#fff;border:1px solid #ccc;}
-#article_list li{padding:5px;border-bottom:1px solid #eee;cursor:pointer;}
-#article_list li:hover{background:#e0e0e0;}
+#article_list{position:relative;overflow:auto;flex:1;background:#fff;border:1px solid #ccc;}
+#article_list .row{position:absolute;left:0;right:0;height:28px;line-height:28px;padding:0 5px;box-sizing:border-box;border-bottom:1px solid #eee;cursor:pointer;white-space:nowrap;overflow:hidden;text-overflow:ellipsis;}
+#article_list .row:hover{background:#e0e0e0;}
 #right{flex:1;padding:20px;overflow:auto;background:#fff;}
 #content{line-height:1.8;font-size:16px;font-family:Segoe UI, sans-serif;}
 #content img{max-width:100%;display:block;margin:10px 0;}
 #theme_controls{margin-top:10px;padding:5px;border:1px solid #ccc;background:#e9e9e9;}
 </style>
 <script>
+function pushUpdates(lines,progress,limit){
+var log=document.getElementById("log");
+if(lines.length){var frag=document.createDocumentFragment();
+lines.forEach(function(l){var d=document.createElement("div");d.textContent=l;frag.appendChild(d);});
+log.appendChild(frag);
+while(log.childNodes.length>limit){log.removeChild(log.firstChild);}
+log.scrollTop=log.scrollHeight;}
+if(progress!==null){document.getElementById("progress").value=progress;document.getElementById("progress_text").innerText="进度: "+progress.toFixed(2)+"%";}
+}
+var articleTitles=[],ROW_H=28,OVERSCAN=10,listScheduled=false;
+function resetArticles(){articleTitles=[];document.getElementById("article_list").scrollTop=0;scheduleList();}
+function updateArticles(items){items.forEach(function(it){articleTitles[it.i]=it.t;});scheduleList();}
+function scheduleList(){if(!listScheduled){listScheduled=true;requestAnimationFrame(renderList);}}
+function renderList(){
+listScheduled=false;
+var box=document.getElementById("article_list");
+document.getElementById("article_spacer").style.height=(articleTitles.length*ROW_H)+"px";
+var first=Math.max(0,Math.floor(box.scrollTop/ROW_H)-OVERSCAN);
+var last=Math.min(articleTitles.length,Math.ceil((box.scrollTop+box.clientHeight)/ROW_H)+OVERSCAN);
+box.querySelectorAll(".row").forEach(function(r){r.remove();});
+var frag=document.createDocumentFragment();
+for(var i=first;i<last;i++){var row=document.createElement("div");row.className="row";row.style.top=(i*ROW_H)+"px";row.textContent=articleTitles[i]||"";row.dataset.index=i;frag.appendChild(row);}
+box.appendChild(frag);
+}
+function listClick(e){var row=e.target.closest(".row");if(row){showArticle(parseInt(row.dataset.index));}}
 function showArticle(index){window.pywebview.api.selectArticle(index);}
 function startCrawl(){var url=document.getElementById("url_input").value;window.pywebview.api.startCrawl(url);}
+function resumeCrawl(){var url=document.getElementById("url_input").value;window.pywebview.api.resumeCrawl(url);}
 function applyTheme(){var fsize=document.getElementById("font_size").value;var lheight=document.getElementById("line_height").value;var bgcolor=document.getElementById("bgcolor").value;var ffamily=document.getElementById("font_family").value;window.pywebview.api.applyTheme(fsize,lheight,bgcolor,ffamily);}
 </script>
 </head>
@@ -236,10 +1792,11 @@ function applyTheme(){var fsize=document.getElementById("font_size").value;var l
 <div id="url_section">
 <input type="text" id="url_input" placeholder="输入网站 URL">
 <button onclick="startCrawl()">开始抓取</button>
+<button onclick="resumeCrawl()">继续抓取</button>
 </div>
 <progress id="progress" value="0" max="100"></progress>
 <div id="progress_text">进度: 0%</div>
-<ul id="article_list"></ul>
+<div id="article_list" onscroll="scheduleList()" onclick="listClick(event)"><div id="article_spacer"></div></div>
 <div id="log"></div>
 <div id="theme_controls">
 <h4>阅读主题</h4>
@@ -258,24 +1815,20 @@ function applyTheme(){var fsize=document.getElementById("font_size").value;var l
 </body></html>
 """
 
-def build_article_list_js():
-    js = "var list='';"
-    for i,a in enumerate(articles):
-        safe_title = a["title"].replace('"','&quot;')
-        js += f"list+='<li onclick=\"showArticle({i})\">{safe_title}</li>';"
-    js += "document.getElementById('article_list').innerHTML=list;"
-    return js
-
 class Api:
     def selectArticle(self,index):
+        # 正文在选中时才从磁盘读取
         content = articles[int(index)]["content"]
         css = f"font-size:{theme_settings['font_size']};line-height:{theme_settings['line_height']};background:{theme_settings['background_color']};font-family:{theme_settings['font_family']};"
-        js = f'document.getElementById("content").style="{css}";document.getElementById("content").innerHTML=`{content}`;'
+        js = f'document.getElementById("content").style="{css}";document.getElementById("content").innerHTML={json.dumps(content, ensure_ascii=False)};'
         webview.windows[0].evaluate_js(js)
 
     def startCrawl(self,url):
         threading.Thread(target=self._crawl_thread,args=(url,),daemon=True).start()
 
+    def resumeCrawl(self,url):
+        threading.Thread(target=self._crawl_thread,args=(url,True),daemon=True).start()
+
     def applyTheme(self,fsize,lheight,bgcolor,ffamily):
         theme_settings["font_size"]=fsize
         theme_settings["line_height"]=lheight
@@ -284,25 +1837,97 @@ class Api:
         if articles:
             self.selectArticle(0)
 
-    def _crawl_thread(self,url):
-        global articles,rss_cache,visited_links
-        append_log("🚀 开始抓取...")
+    def _crawl_thread(self,url,resume=False):
+        global articles
+        append_log("🚀 继续抓取..." if resume else "🚀 开始抓取...")
         articles.clear()
-        visited_links.clear()
-        rss_cache=""
-        arts = get_all_links(url)
-        articles.extend(arts)
-        append_log(f"✅ 抓取完成，共 {len(articles)} 篇文章")
-        rss_cache = generate_rss(url, articles)
-        js = build_article_list_js()
-        webview.windows[0].evaluate_js(js)
+        ui_channel.reset_articles()
+        arts = crawl_site(url, resume=resume, on_article=self._on_article)
+        articles[:] = arts
 
-def main():
+    def _on_article(self,index,article):
+        # 抓取过程中逐篇追加到列表（重复内容替换时按原序号更新）
+        if index<len(articles):
+            articles[index] = article
+        else:
+            articles.append(article)
+        ui_channel.update_article(index, article["title"])
+
+def run_gui():
+    global webview
+    import webview
     threading.Thread(target=start_rss_server,daemon=True).start()
+    threading.Thread(target=ui_channel.run,daemon=True).start()
     api = Api()
     webview.create_window("全站RSS抓取工具",html=html_template,js_api=api,width=1200,height=800)
     webview.start(gui='edgechromium')
 
+# ---------------------- 命令行 / 无界面模式 ----------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="全站RSS抓取工具：不带参数启动图形界面，带 URL 则以无界面模式运行")
+    parser.add_argument("urls", nargs="*", help="要抓取的网站 URL，可指定多个")
+    parser.add_argument("--serve", action="store_true", help="抓取完成后继续运行本地 RSS 服务（守护模式）")
+    parser.add_argument("--host", default=RSS_SERVER_HOST, help="RSS 服务监听地址")
+    parser.add_argument("--port", type=int, default=RSS_SERVER_PORT, help="RSS 服务端口")
+    parser.add_argument("--output-dir", default=FEEDS_DIR, help="RSS 文件输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="并发抓取线程数")
+    parser.add_argument("--resume", action="store_true", help="从上次中断处继续抓取")
+    parser.add_argument("--interval", type=int, default=None, help="定时重抓间隔（秒），指定后持续运行")
+    parser.add_argument("--sites-file", default=None, help="站点列表 JSON，可为每个站点单独设置 interval")
+    parser.add_argument("--max-concurrent", type=int, default=SCHEDULE_MAX_CONCURRENT, help="所有站点合计同时抓取数")
+    parser.add_argument("--jitter", type=float, default=SCHEDULE_JITTER, help="重抓间隔随机抖动比例")
+    args = parser.parse_args(argv)
+    if args.interval is not None and args.interval<=0:
+        parser.error("--interval 必须大于 0")
+    if args.interval is not None and not (args.urls or args.sites_file):
+        parser.error("--interval 需要至少一个 URL 或 --sites-file")
+    return args
+
+def run_headless(args):
+    # 断点 / 增量记录与 AI 缓存跟 RSS 文件放在同一输出目录，不写到当前目录（已配置了目录的路径保持不变）
+    global CRAWL_DB, AI_CACHE_DB
+    if args.serve:
+        threading.Thread(target=start_rss_server,args=(args.host,args.port),daemon=True).start()
+    os.makedirs(args.output_dir, exist_ok=True)
+    if not os.path.dirname(CRAWL_DB):
+        CRAWL_DB = os.path.join(args.output_dir, CRAWL_DB)
+    if not os.path.dirname(AI_CACHE_DB):
+        AI_CACHE_DB = os.path.join(args.output_dir, AI_CACHE_DB)
+    if args.interval or args.sites_file:
+        sites = load_sites(args.sites_file) if args.sites_file else []
+        sites += [{"url": u, "interval": args.interval} for u in args.urls]
+        if not sites:
+            raise SystemExit("❌ 没有可定时抓取的站点")
+        for site in sites:
+            site.setdefault("interval", args.interval)
+        scheduler = CrawlScheduler(sites, max_concurrent=args.max_concurrent, jitter=args.jitter,
+                                   output_dir=args.output_dir, workers=args.workers)
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
+        return
+    for url in args.urls:
+        append_log(f"🚀 开始抓取: {url}")
+        try:
+            path = os.path.join(args.output_dir, f"{make_site_id(url)}.xml")
+            crawl_site(url, resume=args.resume, path=path, workers=args.workers)
+        except Exception as e:
+            append_log(f"❌ 抓取失败: {url} ({e})")
+    if args.serve:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.urls or args.serve or args.sites_file or args.interval is not None:
+        run_headless(args)
+    else:
+        run_gui()
+
 if __name__=="__main__":
 
     main()
@@ -0,0 +1,76 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import rss_gui
+
+SHORT = "<html><head><title>Short</title></head><body><h1>Short</h1><p>tiny</p></body></html>"
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(rss_gui, "append_log", lambda msg: None)
+
+
+def test_trim_for_ai_drops_boilerplate():
+    html = ("<html><head><script>var x=1;</script><style>p{}</style></head><body>"
+            "<nav>menu</nav><article><p>Body text</p></article><footer>foot</footer></body></html>")
+    trimmed = rss_gui.trim_for_ai(html)
+    assert "Body text" in trimmed
+    assert "var x" not in trimmed and "menu" not in trimmed and "foot" not in trimmed
+
+
+def test_failed_ai_result_falls_back_to_short_article(monkeypatch):
+    article = {"title": "Short", "url": "https://example.com/s", "content": "<p>tiny</p>", "content_text": "tiny"}
+    monkeypatch.setattr(rss_gui, "gemini_extract", lambda url, html: "<p>ok</p>")
+    monkeypatch.setattr(rss_gui, "build_content", lambda *args: (_ for _ in ()).throw(ValueError("broken")))
+    assert rss_gui.complete_with_ai(article["url"], article, SHORT) == article
+
+
+def test_queued_ai_failure_does_not_abort_crawl(serve_pages, monkeypatch):
+    base, _ = serve_pages({"/": SHORT})
+    monkeypatch.setattr(rss_gui, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(rss_gui, "gemini_extract", lambda url, html: (_ for _ in ()).throw(RuntimeError("bad reply")))
+    arts = rss_gui.get_all_links(base+"/", workers=1, visited=set(), discover=False)
+    assert [rss_gui.url_key(a["url"]) for a in arts] == [rss_gui.url_key(base)]
+    assert "tiny" in arts[0]["content_text"]
+
+
+@pytest.fixture
+def gemini_stub(monkeypatch, tmp_path):
+    # 本地桩服务代替 GEMINI_ENDPOINT，posts 记录收到的请求；AI 结果缓存放在临时目录
+    posts = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            posts.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            body = json.dumps({"content": "<p>" + "extracted by ai " * 50 + "</p>"}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(rss_gui, "GEMINI_API_KEY", "test")
+    monkeypatch.setattr(rss_gui, "GEMINI_ENDPOINT", f"http://127.0.0.1:{server.server_port}/extract")
+    monkeypatch.setattr(rss_gui, "AI_CACHE_DB", str(tmp_path / "ai_cache.db"))
+    monkeypatch.setattr(rss_gui, "_ai_cache", None)
+    yield posts
+    server.shutdown()
+
+
+def test_second_crawl_reuses_cached_ai_result(serve_pages, gemini_stub):
+    base, _ = serve_pages({"/": SHORT})
+    first = rss_gui.get_all_links(base+"/", workers=1, visited=set(), discover=False)
+    assert len(gemini_stub) == 1 and "tiny" in gemini_stub[0]["input"]
+    assert "extracted by ai" in first[0]["content_text"]
+    second = rss_gui.get_all_links(base+"/", workers=1, visited=set(), discover=False)
+    assert len(gemini_stub) == 1
+    assert second[0]["content"] == first[0]["content"]
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import rss_gui
+
+
+@pytest.fixture(autouse=True)
+def no_gui(monkeypatch):
+    def fail():
+        raise AssertionError("GUI should not start")
+    monkeypatch.setattr(rss_gui, "run_gui", fail)
+    # run_headless 会把状态文件路径改到输出目录，测试结束后还原
+    for name in ("CRAWL_DB", "AI_CACHE_DB", "_crawl_store", "_ai_cache", "rss_server"):
+        monkeypatch.setattr(rss_gui, name, getattr(rss_gui, name))
+
+
+def test_interval_without_sites_is_rejected(capsys):
+    with pytest.raises(SystemExit) as exc:
+        rss_gui.main(["--interval", "600"])
+    assert exc.value.code == 2
+    assert "--interval" in capsys.readouterr().err
+
+
+def test_non_positive_interval_is_rejected():
+    with pytest.raises(SystemExit):
+        rss_gui.parse_args(["https://example.com", "--interval", "0"])
+
+
+def test_empty_sites_file_is_rejected(tmp_path):
+    sites = tmp_path/"sites.json"
+    sites.write_text(json.dumps([]))
+    with pytest.raises(SystemExit) as exc:
+        rss_gui.main(["--sites-file", str(sites), "--output-dir", str(tmp_path/"feeds")])
+    assert exc.value.code != 0
+
+
+def test_interval_runs_scheduler_headless(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(rss_gui.CrawlScheduler, "run_forever", lambda self: started.append(dict(self.sites)))
+    rss_gui.main(["https://example.com", "--interval", "600", "--output-dir", str(tmp_path)])
+    assert started == [{"https://example.com": {"url": "https://example.com", "interval": 600}}]
+
+
+def test_load_sites_accepts_strings_and_objects(tmp_path):
+    sites = tmp_path/"sites.json"
+    sites.write_text(json.dumps(["https://a.example", {"url": "https://b.example", "interval": 60}]))
+    assert rss_gui.load_sites(str(sites)) == [{"url": "https://a.example"}, {"url": "https://b.example", "interval": 60}]
+
+
+def test_headless_state_lives_in_output_dir(tmp_path, monkeypatch):
+    crawled = []
+    monkeypatch.setattr(rss_gui, "get_all_links", lambda url, **kw: crawled.append(kw["store"]) or [])
+    logs = []
+    monkeypatch.setattr(rss_gui, "append_log", logs.append)
+    rss_gui.main(["https://example.com", "--output-dir", str(tmp_path)])
+    assert rss_gui.CRAWL_DB == str(tmp_path/"crawl_store.db")
+    assert rss_gui.AI_CACHE_DB == str(tmp_path/"ai_cache.db")
+    assert (tmp_path/"crawl_store.db").exists() and (tmp_path/"example.com.xml").exists()
+    crawled[0].close()
+    # 未启动本地服务时不提示订阅地址
+    assert not any("本站订阅地址" in line for line in logs)
@@ -0,0 +1,64 @@
+import rss_gui
+
+BASE = " ".join(f"word{i}" for i in range(400))
+
+
+def article(url, text):
+    return {"title": url, "url": url, "content": f"<p>{text}</p>", "content_text": text}
+
+
+def test_deduplicate_articles_keeps_longest_copy_in_first_position():
+    arts = [
+        article("a", BASE),
+        article("b", " ".join(f"other{i}" for i in range(400))),
+        article("a-print", BASE + " footer"),
+        article("a-short", BASE[:len(BASE)-40]),
+    ]
+    assert [a["url"] for a in rss_gui.deduplicate_articles(arts)] == ["a-print", "b"]
+
+
+def test_merge_duplicate_statuses():
+    index = rss_gui.NearDuplicateIndex()
+    kept = []
+    assert rss_gui.merge_duplicate(index, kept, article("a", BASE)) == (0, "new")
+    kept.append(article("a", BASE))
+    assert rss_gui.merge_duplicate(index, kept, article("a2", BASE)) == (0, "duplicate")
+    assert rss_gui.merge_duplicate(index, kept, article("a3", BASE + " more words")) == (0, "replaced")
+    assert rss_gui.merge_duplicate(index, kept, article("c", "completely different text here")) == (1, "new")
+
+
+def test_minhash_signature_shape_and_determinism():
+    sig = rss_gui.minhash_signature(BASE)
+    assert len(sig) == rss_gui.DEDUP_BINS
+    assert sig == rss_gui.minhash_signature(BASE)
+    assert rss_gui.minhash_signature(BASE.upper()) == sig
+    assert rss_gui._EMPTY_BIN not in rss_gui.minhash_signature("短文本")
+
+
+def test_signature_similarity_tracks_overlap():
+    words = BASE.split()
+    sig = rss_gui.minhash_signature(BASE)
+    near = rss_gui.minhash_signature(" ".join(words[:396] + ["edited", "ending"]))
+    far = rss_gui.minhash_signature(" ".join(f"other{i}" for i in range(400)))
+    assert rss_gui.signature_similarity(sig, sig) == 1.0
+    assert rss_gui.signature_similarity(sig, near) >= rss_gui.DEDUP_THRESHOLD
+    assert rss_gui.signature_similarity(sig, far) < 0.2
+
+
+def test_cjk_text_is_tokenised_per_character():
+    chars = "这是一篇关于全站抓取工具的文章正文内容包括标题链接图片以及段落格式说明"
+    text = "".join(chars[(i*7+i//len(chars)) % len(chars)] for i in range(1500))
+    assert rss_gui.signature_similarity(rss_gui.minhash_signature(text),
+                                        rss_gui.minhash_signature(text + "补充一句。")) >= rss_gui.DEDUP_THRESHOLD
+
+
+def test_near_duplicate_index_find():
+    index = rss_gui.NearDuplicateIndex()
+    index.add("a", rss_gui.minhash_signature(BASE))
+    index.add("b", rss_gui.minhash_signature(" ".join(f"other{i}" for i in range(400))))
+    assert index.find(rss_gui.minhash_signature(BASE + " tail")) == "a"
+    assert index.find(rss_gui.minhash_signature(" ".join(f"third{i}" for i in range(400)))) is None
+    strict = rss_gui.NearDuplicateIndex(threshold=1.0)
+    strict.add("a", rss_gui.minhash_signature(BASE))
+    assert strict.find(rss_gui.minhash_signature(BASE)) == "a"
+    assert strict.find(rss_gui.minhash_signature(" ".join(BASE.split()[:200]))) is None
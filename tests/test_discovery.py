@@ -0,0 +1,126 @@
+import functools
+import gzip
+import io
+import threading
+from collections import Counter
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import rss_gui
+
+SITEMAP_INDEX = b"""<?xml version="1.0"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>/posts.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+URLSET = b"""<?xml version="1.0"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>%(base)s/a.html</loc><lastmod>2024-01-02</lastmod></url>
+  <url><loc>%(base)s/b.html</loc><lastmod>2024-01-03T10:00:00Z</lastmod></url>
+  <url><loc>http://elsewhere.org/c.html</loc></url>
+</urlset>"""
+
+RSS = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><title>A</title><link>%(base)s/feed-only.html</link><pubDate>Mon, 08 Jan 2024 00:00:00 GMT</pubDate></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom">
+<entry><link rel="edit" href="/edit/1"/><link href="/atom-entry.html"/><updated>2024-02-01T00:00:00+08:00</updated></entry>
+</feed>"""
+
+HOME = b"""<html><head><title>Home</title>
+<link rel="alternate" type="application/rss+xml" href="/feed.xml">
+<link rel="stylesheet" href="/style.css">
+</head><body><a href="/a.html">A</a></body></html>"""
+
+ARTICLE = b"<html><head><title>%s</title></head><body><h1>%s</h1><p>%s</p></body></html>"
+
+
+def test_parse_lastmod():
+    assert rss_gui.parse_lastmod("2024-01-02") == 1704153600.0
+    assert rss_gui.parse_lastmod("2024-01-02T00:00:00Z") == 1704153600.0
+    assert rss_gui.parse_lastmod("2024-01-02T08:00:00+08:00") == 1704153600.0
+    assert rss_gui.parse_lastmod("Tue, 02 Jan 2024 00:00:00 GMT") == 1704153600.0
+    assert rss_gui.parse_lastmod(" 2024-01-02 ") == 1704153600.0
+    assert rss_gui.parse_lastmod("") is None
+    assert rss_gui.parse_lastmod(None) is None
+    assert rss_gui.parse_lastmod("yesterday") is None
+
+
+def test_iter_xml_links_sitemaps_and_feeds():
+    assert list(rss_gui.iter_xml_links(io.BytesIO(SITEMAP_INDEX))) == [("sitemap", "/posts.xml.gz", None)]
+    pages = list(rss_gui.iter_xml_links(io.BytesIO(URLSET % {b"base": b"http://x.example"})))
+    assert [(kind, loc) for kind, loc, _ in pages] == [
+        ("page", "http://x.example/a.html"), ("page", "http://x.example/b.html"), ("page", "http://elsewhere.org/c.html")]
+    assert pages[1][2] == rss_gui.parse_lastmod("2024-01-03T10:00:00Z")
+    assert pages[2][2] is None
+    assert list(rss_gui.iter_xml_links(io.BytesIO(RSS % {b"base": b"http://x.example"}))) == [
+        ("page", "http://x.example/feed-only.html", rss_gui.parse_lastmod("Mon, 08 Jan 2024 00:00:00 GMT"))]
+    assert list(rss_gui.iter_xml_links(io.BytesIO(ATOM))) == [
+        ("page", "/atom-entry.html", rss_gui.parse_lastmod("2024-02-01T00:00:00+08:00"))]
+
+
+@pytest.mark.parametrize("backend", sorted(rss_gui.PARSERS))
+def test_parse_page_reports_declared_feeds(backend, monkeypatch):
+    monkeypatch.setattr(rss_gui, "PARSER_BACKEND", backend)
+    monkeypatch.setattr(rss_gui, "_parsers", {})
+    article, _ = rss_gui.parse_page("http://x.example/", HOME.decode(), ai_fallback=False)
+    assert article["feeds"] == ["http://x.example/feed.xml"]
+
+
+@pytest.fixture
+def site(tmp_path):
+    hits = Counter()
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            hits[self.path] += 1
+            return super().do_GET()
+
+        def guess_type(self, path):
+            return "text/html" if path.endswith((".html", "/")) else "application/xml"
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(tmp_path)))
+    base = f"http://127.0.0.1:{server.server_port}"
+    (tmp_path/"robots.txt").write_text(f"User-agent: *\nSitemap: {base}/sitemap_index.xml\n")
+    (tmp_path/"sitemap_index.xml").write_bytes(SITEMAP_INDEX)
+    (tmp_path/"posts.xml.gz").write_bytes(gzip.compress(URLSET % {b"base": base.encode()}))
+    (tmp_path/"feed.xml").write_bytes(RSS % {b"base": base.encode()})
+    (tmp_path/"index.html").write_bytes(HOME)
+    for name in ("a", "b", "feed-only"):
+        text = (" ".join(f"{name}{i}" for i in range(300))).encode()
+        (tmp_path/f"{name}.html").write_bytes(ARTICLE % (name.encode(), name.encode(), text))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield base, hits
+    server.shutdown()
+
+
+def test_discover_seeds_follows_gzip_sitemap_index(site):
+    base, _ = site
+    seeds = rss_gui.discover_seeds(base+"/")
+    assert seeds == {base+"/a.html": rss_gui.parse_lastmod("2024-01-02"),
+                     base+"/b.html": rss_gui.parse_lastmod("2024-01-03T10:00:00Z")}
+
+
+def test_malformed_loc_only_skips_that_entry(site, tmp_path):
+    base, _ = site
+    (tmp_path/"broken.xml").write_text(
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"<url><loc>{base}/a.html</loc></url><url><loc>http://[bad</loc></url><url><loc>{base}/b.html</loc></url>"
+        "</urlset>")
+    seeds = rss_gui.discover_seeds(base+"/", sources=[base+"/broken.xml"])
+    assert list(seeds) == [base+"/a.html", base+"/b.html"]
+
+
+def test_crawl_reads_start_page_feeds_without_refetching(site, monkeypatch):
+    base, hits = site
+    monkeypatch.setattr(rss_gui, "append_log", lambda msg: None)
+    arts = rss_gui.get_all_links(base+"/", workers=2, visited=set())
+    assert {a["url"] for a in arts} >= {base+"/a.html", base+"/b.html", base+"/feed-only.html"}
+    assert all("feeds" not in a for a in arts)
+    assert hits["/"] == 1
+    assert hits["/feed.xml"] == 1
@@ -0,0 +1,16 @@
+import rss_gui
+
+
+def test_url_domain_uses_registered_domain():
+    assert rss_gui.url_domain("https://blog.example.co.uk/a") == "example.co.uk"
+    assert rss_gui.url_domain("https://WWW.Example.com:8080/") == "example.com"
+    assert rss_gui.url_domain("https://example.com/a") == rss_gui.url_domain("http://news.example.com/b")
+    assert rss_gui.url_domain("https://example.com/") != rss_gui.url_domain("https://example.org/")
+
+
+def test_registered_domain_is_cached():
+    rss_gui.registered_domain.cache_clear()
+    rss_gui.url_domain("https://a.example.com/1")
+    rss_gui.url_domain("https://a.example.com/2")
+    info = rss_gui.registered_domain.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
@@ -0,0 +1,112 @@
+import http.client
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import rss_gui
+
+ARTICLES = [
+    {"title": "First", "url": "https://example.com/1", "content": "<p>one</p>", "content_text": "one"},
+    {"title": "Second", "url": "https://example.com/2", "content": "<p>two</p>", "content_text": "two"},
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_feeds(monkeypatch):
+    monkeypatch.setattr(rss_gui, "feeds", {})
+    monkeypatch.setattr(rss_gui, "rss_cache", None)
+
+
+def render(articles):
+    return "".join(rss_gui.FeedWriter().chunks("https://example.com", articles))
+
+
+def test_etag_ignores_last_build_date():
+    a = render(ARTICLES)
+    b = rss_gui._LAST_BUILD_RE.sub(b"<lastBuildDate>Mon, 01 Jan 2001 00:00:00 +0000</lastBuildDate>", a.encode("utf-8"))
+    assert a.encode("utf-8") != b
+    assert rss_gui.feed_etag(a) == rss_gui.feed_etag(b)
+    assert rss_gui.feed_etag(a) != rss_gui.feed_etag(render(ARTICLES[:1]))
+
+
+def test_republishing_unchanged_feed_keeps_validators():
+    first = rss_gui.publish_feed("site", render(ARTICLES))
+    rebuilt = rss_gui._LAST_BUILD_RE.sub(b"<lastBuildDate>Mon, 01 Jan 2001 00:00:00 +0000</lastBuildDate>", render(ARTICLES).encode("utf-8"))
+    again = rss_gui.publish_feed("site", rebuilt)
+    assert again is first
+    assert rss_gui.rss_cache is first
+    changed = rss_gui.publish_feed("site", render(ARTICLES[:1]))
+    assert changed is not first
+    assert changed.etag != first.etag
+
+
+def test_negotiate():
+    body = rss_gui.FeedBody(render(ARTICLES))
+    assert body.negotiate(None) == "identity"
+    assert body.negotiate("gzip, deflate") == "gzip"
+    assert body.negotiate("gzip;q=0") == "identity"
+    assert body.negotiate("*") == ("br" if rss_gui.brotli is not None else "gzip")
+    assert body.negotiate("identity, gzip;q=0.5") == "gzip"
+
+
+def test_not_modified():
+    body = rss_gui.FeedBody(render(ARTICLES), modified=1_000_000)
+    assert body.not_modified({"If-None-Match": body.etag})
+    assert body.not_modified({"If-None-Match": f'"other", W/{body.etag}'})
+    assert body.not_modified({"If-None-Match": "*"})
+    assert not body.not_modified({"If-None-Match": '"other"'})
+    # If-None-Match 优先于 If-Modified-Since
+    assert not body.not_modified({"If-None-Match": '"other"', "If-Modified-Since": body.last_modified})
+    assert body.not_modified({"If-Modified-Since": body.last_modified})
+    assert not body.not_modified({"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})
+    assert not body.not_modified({"If-Modified-Since": "garbage"})
+    assert not body.not_modified({})
+
+
+def test_streamed_feed_can_be_published(tmp_path):
+    path = str(tmp_path/"feed.xml")
+    assert rss_gui.generate_rss("https://example.com", ARTICLES, path=path, stream=True, writer=rss_gui.FeedWriter()) is None
+    body = rss_gui.publish_feed("site", path=path)
+    with open(path, encoding="utf-8") as f:
+        expected = f.read()
+    assert body.bodies["identity"] == expected.encode("utf-8")
+    assert body.etag == rss_gui.feed_etag(render(ARTICLES))
+
+
+def test_published_file_is_served_byte_for_byte(tmp_path):
+    path = tmp_path/"feed.xml"
+    raw = render(ARTICLES).replace("\n", "\r\n").encode("utf-8")
+    path.write_bytes(raw)
+    body = rss_gui.publish_feed("site", path=str(path))
+    assert body.bodies["identity"] == raw
+    assert body.etag == rss_gui.feed_etag(raw)
+
+
+@pytest.fixture
+def rss_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), rss_gui.RSSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def get(headers):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+        conn.request("GET", "/rss/site", headers=headers)
+        r = conn.getresponse()
+        r.read()
+        conn.close()
+        return r
+    yield get
+    server.shutdown()
+
+
+def test_each_encoding_has_its_own_etag(rss_server):
+    body = rss_gui.publish_feed("site", render(ARTICLES))
+    plain = rss_server({"Accept-Encoding": "identity"})
+    zipped = rss_server({"Accept-Encoding": "gzip"})
+    assert zipped.getheader("Content-Encoding") == "gzip"
+    assert plain.getheader("ETag") == body.etag
+    assert zipped.getheader("ETag") not in (None, body.etag)
+    cached = rss_server({"Accept-Encoding": "gzip", "If-None-Match": zipped.getheader("ETag")})
+    assert cached.status == 304
+    assert cached.getheader("ETag") == zipped.getheader("ETag")
+    assert cached.getheader("Vary") == "Accept-Encoding"
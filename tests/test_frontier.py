@@ -0,0 +1,59 @@
+import pytest
+
+import rss_gui
+
+
+def test_url_score_prefers_article_like_urls():
+    score = rss_gui.url_score
+    article = score("https://example.com/2024/05/how-to-build-a-crawler.html", "How to build a crawler in Python")
+    assert article > score("https://example.com/tag/python", "python")
+    assert article > score("https://example.com/category/news/page/2", "2")
+    assert score("https://example.com/posts/12345") > score("https://example.com/login")
+    assert score("https://example.com/images/photo.jpg") == -5.0
+    assert score("https://example.com") < score("https://example.com/blog/some-long-post-title")
+    assert score("https://example.com/a/b", from_article=True) == score("https://example.com/a/b") + 0.5
+    assert score("https://example.com/x", "下一页") < score("https://example.com/x")
+    assert score("https://example.com/x", "全站抓取工具使用说明") > score("https://example.com/x")
+
+
+def test_url_pattern():
+    assert rss_gui.url_pattern("https://example.com") == "/"
+    assert rss_gui.url_pattern("https://example.com/2024/05/my-first-post") == "0/3/slug"
+    assert rss_gui.url_pattern("https://example.com/2023/11/another-long-post") == "0/3/slug"
+    assert rss_gui.url_pattern("https://example.com/p/123456") == "p/2/num"
+    assert rss_gui.url_pattern("https://example.com/Tag/python") == "tag/2/word"
+
+
+def test_frontier_pops_best_first_and_dedups():
+    frontier = rss_gui.Frontier(priority=True)
+    assert frontier.push("https://example.com/tag/a", "a")
+    assert frontier.push("https://example.com/2024/05/a-long-article-slug", "A long article title here")
+    assert frontier.push("https://example.com/notes")
+    assert not frontier.push("https://www.example.com/tag/a/?utm_source=x")
+    assert len(frontier) == 3
+    assert frontier.pop() == "https://example.com/2024/05/a-long-article-slug"
+    assert frontier.pop() == "https://example.com/notes"
+    assert frontier.pop() == "https://example.com/tag/a"
+
+
+def test_frontier_fifo_when_priority_disabled():
+    urls = ["https://example.com/tag/a", "https://example.com/2024/05/a-long-article-slug", "https://example.com/login"]
+    frontier = rss_gui.Frontier(urls, priority=False)
+    assert [frontier.pop() for _ in urls] == urls
+
+
+def test_frontier_learns_from_feedback(monkeypatch):
+    monkeypatch.setattr(rss_gui, "PRIORITY_RESCORE_EVERY", 4)
+    frontier = rss_gui.Frontier(priority=True)
+    frontier.push("https://example.com/notes/alpha")
+    frontier.push("https://example.com/news/beta")
+    for i in range(4):
+        frontier.record(f"https://example.com/notes/x{i}", False)
+    assert frontier.pop() == "https://example.com/news/beta"
+
+
+@pytest.mark.parametrize("seen", [["https://example.com/a"]])
+def test_frontier_skips_seen(seen):
+    frontier = rss_gui.Frontier(seen=[rss_gui.url_key(u) for u in seen])
+    assert not frontier.push("http://www.example.com/a")
+    assert frontier.push("https://example.com/b")
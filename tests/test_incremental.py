@@ -0,0 +1,132 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import rss_gui
+
+LAST_MODIFIED = "Mon, 08 Jan 2024 00:00:00 GMT"
+
+
+def _page(title):
+    words = " ".join(f"{title.lower()}{i}" for i in range(300))
+    return f"<html><head><title>{title}</title></head><body><h1>{title}</h1><p>{words}</p></body></html>"
+
+
+@pytest.fixture
+def server():
+    # pages 为 {路径: (HTML, 是否带 ETag / Last-Modified)}；requests 记录每次请求的路径与条件头
+    pages = {}
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            requests.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+            if self.path not in pages:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body, validators = pages[self.path]
+            etag = f'"{hash(body) & 0xffff:x}"'
+            if validators and self.headers.get("If-None-Match")==etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if validators:
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", pages, requests
+    httpd.shutdown()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = rss_gui.CrawlStore(str(tmp_path / "crawl.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def extract():
+    # 统计正文提取次数
+    calls = []
+    parse_page = rss_gui.parse_page
+
+    def counting(url, html, **kwargs):
+        calls.append(url)
+        return parse_page(url, html, **kwargs)
+    counting.calls = calls
+    return counting
+
+
+def test_not_modified_reuses_stored_article(server, store, extract):
+    base, pages, requests = server
+    pages["/a"] = (_page("Alpha"), True)
+    first = rss_gui.crawl_page(base+"/a", store, extract)
+    second = rss_gui.crawl_page(base+"/a", store, extract)
+    assert second == first and first[0]["title"].startswith("Alpha")
+    assert len(extract.calls) == 1
+    path, etag, since = requests[-1]
+    assert etag == store.get_page(base+"/a")["etag"] and since == LAST_MODIFIED
+
+
+def test_unchanged_body_without_validators_skips_extraction(server, store, extract):
+    base, pages, requests = server
+    pages["/b"] = (_page("Beta"), False)
+    first = rss_gui.crawl_page(base+"/b", store, extract)
+    second = rss_gui.crawl_page(base+"/b", store, extract)
+    assert second == first
+    assert len(requests) == 2 and len(extract.calls) == 1
+    pages["/b"] = (_page("Gamma"), False)
+    third = rss_gui.crawl_page(base+"/b", store, extract)
+    assert third[0]["title"].startswith("Gamma") and len(extract.calls) == 2
+
+
+def test_sitemap_lastmod_skips_request(server, store, extract):
+    base, pages, requests = server
+    pages["/c"] = (_page("Delta"), True)
+    first = rss_gui.crawl_page(base+"/c", store, extract)
+    older = rss_gui.parse_lastmod("2024-01-01")
+    assert rss_gui.crawl_page(base+"/c", store, extract, lastmod=older) == first
+    assert len(requests) == 1
+    newer = rss_gui.parse_lastmod("2024-02-01")
+    rss_gui.crawl_page(base+"/c", store, extract, lastmod=newer)
+    assert len(requests) == 2
+
+
+def test_pages_waiting_for_ai_are_not_cached(server, store):
+    base, pages, requests = server
+    pages["/d"] = (_page("Epsilon"), True)
+
+    def short(url, html, **kwargs):
+        return {"title":"Epsilon","url":url,"content":"","content_text":"","ai_html":html}, []
+    article, links = rss_gui.crawl_page(base+"/d", store, short)
+    assert "ai_html" in article
+    assert store.get_page(base+"/d") is None
+
+
+def test_second_crawl_reuses_articles(server, store, extract, monkeypatch):
+    base, pages, requests = server
+    monkeypatch.setattr(rss_gui, "append_log", lambda msg: None)
+    monkeypatch.setattr(rss_gui, "parse_page", extract)
+    pages["/"] = ('<html><body><a href="/e">e</a><a href="/f">f</a></body></html>', True)
+    pages["/e"] = (_page("Zeta"), True)
+    pages["/f"] = (_page("Eta"), False)
+    first = rss_gui.get_all_links(base+"/", workers=1, store=store, incremental=True, visited=set(), discover=False)
+    extracted = len(extract.calls)
+    second = rss_gui.get_all_links(base+"/", workers=1, store=store, incremental=True, visited=set(), discover=False)
+    assert [a["url"] for a in second] == [a["url"] for a in first]
+    assert len(extract.calls) == extracted
@@ -0,0 +1,36 @@
+import pytest
+
+import rss_gui
+
+PAGE = """<html><head><title>Page</title></head><body>
+<h1>Article title</h1>
+<a href="http://[bad">broken</a>
+<a href="/posts/first-post">First post</a>
+<a href="https://example.com/about#team">About</a>
+<p>%s</p>
+</body></html>""" % ("Some article text. " * 30)
+
+
+@pytest.fixture(params=sorted(rss_gui.PARSERS))
+def backend(request, monkeypatch):
+    monkeypatch.setattr(rss_gui, "PARSER_BACKEND", request.param)
+    monkeypatch.setattr(rss_gui, "_parsers", {})
+    return request.param
+
+
+def test_malformed_href_only_drops_that_link(backend):
+    article, links = rss_gui.parse_page("https://example.com/", PAGE, ai_fallback=False)
+    assert article is not None
+    assert article["title"].startswith("Article title")
+    assert [link for link, _ in links] == ["https://example.com/posts/first-post", "https://example.com/about"]
+
+
+def test_anchor_text_is_collected(backend):
+    _, links = rss_gui.parse_page("https://example.com/", PAGE, ai_fallback=False)
+    assert ("https://example.com/posts/first-post", "First post") in links
+
+
+def test_absolute_link():
+    assert rss_gui.absolute_link("https://example.com/a/", "b") == "https://example.com/a/b"
+    assert rss_gui.absolute_link("https://example.com/", "http://[bad") is None
+    assert rss_gui.absolute_link("https://example.com/", None) is None
@@ -0,0 +1,84 @@
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import rss_gui
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_retry_after_seconds():
+    assert rss_gui.retry_after_seconds(None) is None
+    assert rss_gui.retry_after_seconds("") is None
+    assert rss_gui.retry_after_seconds("7") == 7.0
+    assert rss_gui.retry_after_seconds("-3") == 0.0
+    assert rss_gui.retry_after_seconds("soon") is None
+    assert 25 < rss_gui.retry_after_seconds(formatdate(time.time()+30, usegmt=True)) <= 30
+
+
+def test_release_backs_off_on_429():
+    polite = rss_gui.PolitenessScheduler(max_concurrency=8, rate=4.0, burst=4)
+    url = "http://example.com/a"
+    polite.acquire(url)
+    polite.release(url, FakeResponse(429, {"Retry-After": "5"}), 0.1)
+    state = polite.hosts["example.com"]
+    assert state.blocked_until > time.monotonic()+4
+    assert state.rate == 2.0
+    assert state.limit == 1
+    assert state.inflight == 0
+
+
+def test_release_ramps_up_when_fast():
+    polite = rss_gui.PolitenessScheduler(max_concurrency=4)
+    url = "http://example.com/a"
+    for _ in range(5):
+        polite.acquire(url)
+        polite.release(url, FakeResponse(200), 0.05)
+    assert polite.hosts["example.com"].limit == 4
+
+
+@pytest.fixture
+def throttling_server():
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+
+def test_session_does_not_swallow_retry_after(throttling_server):
+    base, hits = throttling_server
+    start = time.monotonic()
+    r = rss_gui.get_session().get(base+"/a", timeout=5)
+    assert r.status_code == 429
+    assert hits == ["/a"]
+    assert time.monotonic()-start < 1
+
+
+def test_fetch_response_reports_429_to_scheduler(throttling_server, monkeypatch):
+    base, hits = throttling_server
+    monkeypatch.setattr(rss_gui, "POLITE_RETRIES", 0)
+    polite = rss_gui.PolitenessScheduler()
+    assert rss_gui.fetch_response(base+"/a", polite=polite) is None
+    state = polite.hosts[base.split("//")[1]]
+    assert state.blocked_until > time.monotonic()
+    assert state.rate < rss_gui.POLITE_RATE
@@ -0,0 +1,94 @@
+import pytest
+
+import rss_gui
+
+
+def _page(title, body=""):
+    return f"<html><head><title>{title}</title></head><body><h1>{title}</h1>{body}</body></html>"
+
+
+def _text(seed):
+    return "<p>" + " ".join(f"{seed}{i}" for i in range(300)) + "</p>"
+
+
+def _site():
+    links = " ".join(f'<a href="/post{i}">post {i}</a>' for i in range(5))
+    pages = {"/": _page("Home", links + _text("home"))}
+    pages.update({f"/post{i}": _page(f"Post {i}", _text(f"post{i}x")) for i in range(5)})
+    return pages
+
+
+def test_resume_does_not_refetch_finished_pages(serve_pages, monkeypatch, tmp_path):
+    monkeypatch.setattr(rss_gui, "append_log", lambda msg: None)
+    base, hits = serve_pages(_site())
+    store = rss_gui.CrawlStore(str(tmp_path / "crawl.db"))
+    try:
+        monkeypatch.setattr(rss_gui, "MAX_PAGES", 3)
+        first = rss_gui.get_all_links(base+"/", workers=1, store=store, visited=set(), discover=False)
+        assert len(first) == 3
+        monkeypatch.setattr(rss_gui, "MAX_PAGES", 50)
+        # 站点写法不同（无末尾斜杠）也应续上同一份记录
+        arts = rss_gui.get_all_links(base, workers=1, store=store, resume=True, visited=set(), discover=False)
+    finally:
+        store.close()
+    assert len(arts) == 6
+    assert [a["url"] for a in arts[:3]] == [a["url"] for a in first]
+    assert all(n == 1 for path, n in hits.items() if path != "/robots.txt")
+
+
+def test_resume_without_saved_state_crawls_from_start(serve_pages, monkeypatch, tmp_path):
+    monkeypatch.setattr(rss_gui, "append_log", lambda msg: None)
+    base, hits = serve_pages(_site())
+    store = rss_gui.CrawlStore(str(tmp_path / "crawl.db"))
+    try:
+        arts = rss_gui.get_all_links(base+"/", workers=1, store=store, resume=True, visited=set(), discover=False)
+    finally:
+        store.close()
+    assert len(arts) == 6
+
+
+def _article(url, seed):
+    text = " ".join(f"{seed}{i}" for i in range(50))
+    return {"title":seed, "url":url, "content":f"<p>{text}</p>", "content_text":text}
+
+
+def test_stored_article_reads_body_from_store(tmp_path):
+    store = rss_gui.CrawlStore(str(tmp_path / "crawl.db"))
+    try:
+        store.reset("http://site")
+        article = _article("http://site/a", "alpha")
+        store.complete("http://site", article["url"], article, [], 1)
+        lazy = store.lazy("http://site", article)
+        assert set(lazy) == {"title", "url", "text_len", "body_hash"}
+        assert lazy["content"] == article["content"] and lazy["content_text"] == article["content_text"]
+        assert rss_gui.article_length(lazy) == len(article["content_text"])
+        with pytest.raises(KeyError):
+            lazy["summary"]
+
+        frontier, visited, arts = store.load("http://site", lazy=True)
+        assert isinstance(arts[0], rss_gui.StoredArticle)
+        assert arts[0]["title"] == "alpha" and arts[0]["content"] == article["content"]
+        assert arts[0]["text_len"] == len(article["content_text"])
+
+        # 较长的重复版本替换旧文章时，旧正文随之删除
+        longer = _article("http://site/b", "alpha-longer")
+        store.complete("http://site", longer["url"], longer, [], 1, replaced=article["url"])
+        with pytest.raises(KeyError):
+            lazy["content"]
+        assert [a["url"] for a in store.load("http://site")[2]] == [longer["url"]]
+    finally:
+        store.close()
+
+
+def test_crawl_keeps_only_metadata_in_memory(serve_pages, monkeypatch, tmp_path):
+    monkeypatch.setattr(rss_gui, "append_log", lambda msg: None)
+    base, hits = serve_pages(_site())
+    store = rss_gui.CrawlStore(str(tmp_path / "crawl.db"))
+    try:
+        arts = rss_gui.get_all_links(base+"/", workers=1, store=store, visited=set(), discover=False, lazy_bodies=True)
+        assert len(arts) == 6
+        assert all(isinstance(a, rss_gui.StoredArticle) and "content" not in a for a in arts)
+        full = {a["url"]: a for a in store.load(rss_gui.normalize_url(base))[2]}
+        assert all(a["content"] == full[a["url"]]["content"] for a in arts)
+    finally:
+        store.close()
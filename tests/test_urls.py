@@ -0,0 +1,112 @@
+import pytest
+
+import rss_gui
+
+
+@pytest.fixture(autouse=True)
+def no_site_rules(monkeypatch):
+    monkeypatch.setattr(rss_gui, "URL_RULES", {})
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://WWW.Example.COM:80/a/", "http://www.example.com/a"),
+    ("https://example.com:443/", "https://example.com"),
+    ("https://example.com:8443/a", "https://example.com:8443/a"),
+    ("https://example.com/a#comments", "https://example.com/a"),
+    ("https://example.com/?p=123", "https://example.com?p=123"),
+    ("https://example.com/blog?page=2", "https://example.com/blog?page=2"),
+    ("https://example.com/a?utm_source=x&utm_medium=y&fbclid=1&gclid=2", "https://example.com/a"),
+    ("https://example.com/a?b=2&a=1&utm_campaign=z", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?PHPSESSID=abc&id=7", "https://example.com/a?id=7"),
+    ("https://example.com/a;jsessionid=ABC123?x=1", "https://example.com/a?x=1"),
+    ("https://example.com/%7euser/%2fkeep", "https://example.com/~user/%2Fkeep"),
+    ("https://example.com/中文", "https://example.com/%E4%B8%AD%E6%96%87"),
+    ("https://example.com/%e4%b8%ad%e6%96%87", "https://example.com/%E4%B8%AD%E6%96%87"),
+    ("https://example.com/s?q=a%20b", "https://example.com/s?q=a%20b"),
+    ("https://example.com./a", "https://example.com/a"),
+    ("http://[::1]:8000/a", "http://[::1]:8000/a"),
+])
+def test_normalize_url(url, expected):
+    assert rss_gui.normalize_url(url) == expected
+
+
+def test_normalize_url_is_idempotent():
+    url = "HTTP://www.Example.com:80/a/%7e?utm_source=x&b=2&a=1#top"
+    once = rss_gui.normalize_url(url)
+    assert rss_gui.normalize_url(once) == once
+
+
+def test_url_key_ignores_scheme_and_www():
+    assert rss_gui.url_key("http://www.example.com/a/") == rss_gui.url_key("https://example.com/a?utm_source=x")
+    assert rss_gui.url_key("https://example.com/a?p=1") != rss_gui.url_key("https://example.com/a?p=2")
+    assert rss_gui.url_key("https://example.com/a") != rss_gui.url_key("https://blog.example.com/a")
+
+
+def test_site_rules(monkeypatch):
+    monkeypatch.setattr(rss_gui, "URL_RULES", {
+        "example.com": {"keep": ["p"]},
+        "example.org": {"drop": ["sort"]},
+        "example.net": {"drop_query": True},
+        "example.io": lambda url: url.replace("/amp", ""),
+    })
+    assert rss_gui.normalize_url("https://example.com/?page=2&p=5") == "https://example.com?p=5"
+    assert rss_gui.normalize_url("https://blog.example.com/?page=2&p=5") == "https://blog.example.com?p=5"
+    assert rss_gui.normalize_url("https://example.org/a?sort=asc&page=2") == "https://example.org/a?page=2"
+    assert rss_gui.normalize_url("https://example.net/a?id=1") == "https://example.net/a"
+    assert rss_gui.normalize_url("https://example.io/post/amp?utm_source=x") == "https://example.io/post"
+    assert rss_gui.normalize_url("https://other.com/a?sort=asc") == "https://other.com/a?sort=asc"
+
+
+def test_canonical_url():
+    page = "https://example.com/post?utm_source=x"
+    assert rss_gui.canonical_url(page, None) == page
+    assert rss_gui.canonical_url(page, "/post-1") == "https://example.com/post-1"
+    assert rss_gui.canonical_url(page, "https://www.example.com/post") == "https://www.example.com/post"
+    # 跨域、指向首页、畸形的声明都忽略
+    assert rss_gui.canonical_url(page, "https://other.org/post") == page
+    assert rss_gui.canonical_url(page, "/") == page
+    assert rss_gui.canonical_url(page, "http://[bad") == page
+    assert rss_gui.canonical_url("https://example.com/", "https://example.com/") == "https://example.com"
+
+
+def _page(title, body="", head=""):
+    return f"<html><head><title>{title}</title>{head}</head><body><h1>{title}</h1>{body}</body></html>"
+
+
+def _text(seed):
+    return "<p>" + " ".join(f"{seed}{i}" for i in range(300)) + "</p>"
+
+
+def test_crawl_dedups_aliases_and_keeps_query_pages(serve_pages, monkeypatch):
+    monkeypatch.setattr(rss_gui, "append_log", lambda msg: None)
+    pages = {
+        "/": _page("Home", '<a href="/post?utm_source=feed">a</a> <a href="/post#top">b</a> <a href="/post">c</a>'
+                           '<a href="/list">list</a> <a href="/list?page=2">next</a> <a href="/?p=7">p7</a>'),
+        "/post": _page("Post", _text("post")),
+        "/list": _page("List", '<a href="/only-on-page-1">one</a>' + _text("listone")),
+        "/list?page=2": _page("List page 2", '<a href="/only-on-page-2">two</a>' + _text("listtwo"),
+                              '<link rel="canonical" href="/list">'),
+        "/?p=7": _page("Permalink", _text("permalink")),
+        "/only-on-page-1": _page("One", _text("one")),
+        "/only-on-page-2": _page("Two", _text("two")),
+    }
+    base, hits = serve_pages(pages)
+    arts = rss_gui.get_all_links(base+"/", workers=1, visited=set(), discover=False)
+    urls = {a["url"] for a in arts}
+    assert hits["/post"] == 1
+    assert "/post?utm_source=feed" not in hits
+    assert base+"?p=7" in urls
+    # ?page=2 的正文与第一页重复（规范 URL），但它列出的文章仍被抓取
+    assert base+"/list" in urls and base+"/list?page=2" not in urls
+    assert {base+"/only-on-page-1", base+"/only-on-page-2"} <= urls
+
+
+@pytest.mark.parametrize("backend", sorted(rss_gui.PARSERS))
+def test_images_resolve_against_fetched_page_not_canonical(backend, monkeypatch):
+    monkeypatch.setattr(rss_gui, "PARSER_BACKEND", backend)
+    monkeypatch.setattr(rss_gui, "_parsers", {})
+    html = _page("Post", '<img src="pic.png">' + _text("post"), '<link rel="canonical" href="/post/">')
+    article, _ = rss_gui.parse_page("http://x.example.com/post/amp/", html, ai_fallback=False)
+    assert article["url"] == "http://x.example.com/post"
+    assert article["title"] == "Post (http://x.example.com/post)"
+    assert 'src="http://x.example.com/post/amp/pic.png"' in article["content"]